@@ -6,11 +6,13 @@ This module provides a minimal Streamlit UI that lets a user:
 - ask questions about the uploaded documents and view the generated answer
 """
 
+import hashlib
 import os
+import time
 from uuid import uuid4
 import requests
 import streamlit as st
-from typing import List
+from typing import List, Optional
 from src.config import settings
 
 
@@ -18,6 +20,76 @@ from src.config import settings
 API_URL = settings.RAG_API_URL
 
 
+def error_detail(response: requests.Response) -> str:
+    """Return the ``detail`` of an error response, or its raw text."""
+    try:
+        return response.json().get("detail", response.text)
+    except ValueError:
+        return response.text
+
+
+def wait_for_job(job_id: str, poll_interval: float = 1.0, timeout: float = 600.0) -> Optional[dict]:
+    """Poll the backend until the ingestion job ``job_id`` has finished.
+
+    Returns ``None``, after showing the error, when the server no longer
+    knows the job (404: pruned from its job history or lost in a restart)
+    or it has not finished within ``timeout`` seconds. Other errors, such
+    as 503 while the server is loading, are retried until then.
+    """
+    deadline = time.monotonic() + timeout
+    with st.spinner("Indexing uploaded PDFs..."):
+        while True:
+            response = requests.get(f"{API_URL}/jobs/{job_id}")
+            if response.ok:
+                job = response.json()
+                if job["status"] in ("done", "failed"):
+                    return job
+            elif response.status_code == 404:
+                st.error(f"Indexing job {job_id} is unknown to the server: {error_detail(response)}")
+                return None
+            if time.monotonic() >= deadline:
+                reason = "" if response.ok else f": {error_detail(response)}"
+                st.error(f"Indexing job {job_id} did not finish within {timeout:.0f} seconds{reason}")
+                return None
+            time.sleep(poll_interval)
+
+
+def upload_pdf(f, namespace: Optional[str], retries: int = 3) -> Optional[str]:
+    """Send one uploaded file to the backend in parts and return its job id.
+
+    Returns ``None`` when the server has already indexed a file with the same
+    content. Parts are read from the file one at a time; after a failed part
+    the upload resumes from the offset the server reports.
+    """
+    sha256 = hashlib.sha256(f.getbuffer()).hexdigest()
+    params = {"namespace": namespace} if namespace else None
+    if requests.head(f"{API_URL}/files/{sha256}", params=params).ok:
+        return None
+
+    response = requests.post(f"{API_URL}/uploads", json={
+        "filename": f.name, "namespace": namespace, "size": f.size, "sha256": sha256})
+    response.raise_for_status()
+    upload = response.json()
+    upload_id, part_size, offset = upload["upload_id"], upload["part_size"], 0
+    failures = 0
+    while offset < f.size:
+        f.seek(offset)
+        try:
+            response = requests.put(f"{API_URL}/uploads/{upload_id}/parts",
+                                    params={"offset": offset}, data=f.read(part_size))
+            response.raise_for_status()
+            offset = response.json()["received"]
+        except requests.RequestException:
+            failures += 1
+            if failures > retries:
+                raise
+            offset = requests.get(f"{API_URL}/uploads/{upload_id}").json()["received"]
+
+    response = requests.post(f"{API_URL}/uploads/{upload_id}/finish")
+    response.raise_for_status()
+    return response.json().get("job_id")
+
+
 # --- Streamlit UI setup -------------------------------------------------
 st.title("RAG Q&A with history")
 
@@ -26,6 +98,10 @@ st.title("RAG Q&A with history")
 if "session_id" not in st.session_state:
     st.session_state.session_id = f"session_{uuid4().hex[:8]}"
 
+# Documents are uploaded into, and questions answered from, a namespace
+# (document set); leave empty to use the server's default namespace.
+namespace = st.text_input("Namespace (optional)").strip() or None
+
 
 # --- File upload / indexing ---------------------------------------------
 # Allow the user to upload multiple PDF files. Files are compared by filename
@@ -47,21 +123,31 @@ if uploaded_files:
     # Determine which files are newly added compared to the previous upload
     new_pdfs = [f for f in uploaded_files if f.name not in prev_names]
     if new_pdfs:
-        # Prepare multipart file tuples: (fieldname, (filename, bytes, content_type)) 
-        files = [("files", (f.name, f.getvalue(), f.type)) for f in new_pdfs]
-
-        # POST files to the backend /upload endpoint. 
-        response = requests.post(f"{API_URL}/upload", files=files)
-        if response.ok:
-            st.success("Uploaded and indexed.")
-            # Save the upload list so duplicate uploads are avoided in this session
-            st.session_state.previous_upload = uploaded_files
-        else:
+        # Stream each file to the backend in resumable parts; files the
+        # server has already indexed are skipped. Indexing runs in a
+        # background job on the server, so poll its status until it finishes.
+        try:
+            job_ids = [upload_pdf(f, namespace) for f in new_pdfs]
+            jobs = [wait_for_job(job_id) for job_id in job_ids if job_id]
+            finished = [job for job in jobs if job is not None]
+            failures = [failure for job in finished for failure in job["failures"]]
+            if failures:
+                st.error(failures)
+            elif len(finished) == len(jobs):
+                new_chunks = sum(job["chunks_embedded"] for job in jobs)
+                st.success(f"Uploaded and indexed ({new_chunks} new chunks, "
+                           f"{len(job_ids) - len(jobs)} file(s) already indexed).")
+                # Save the upload list so duplicate uploads are avoided in this session
+                st.session_state.previous_upload = uploaded_files
+        except requests.RequestException as e:
             # Surface backend error details to the user
-            st.error(response.text)
+            st.error(e.response.text if e.response is not None else str(e))
 
     st.markdown("---")
     query = st.text_input("Ask a question about the uploaded documents:")
+    # The backend returns short snippets of the retrieved chunks unless the
+    # full chunk text is asked for.
+    full_context = st.checkbox("Show full retrieved context")
 
 
 
@@ -71,6 +157,8 @@ if query:
     payload = {
         "session_id": st.session_state.session_id,
         "question": query,
+        "namespace": namespace,
+        "context": "full" if full_context else "compact",
     }
 
     # Send the question to the backend; backend returns the answer and the
@@ -86,7 +174,11 @@ if query:
         # the document passages that informed the model's answer.
         with st.expander("Retrieved context"):
             for doc in data.get("context", []):
-                st.write(doc.get("page_content", ""))
+                if full_context:
+                    st.write(doc.get("page_content", ""))
+                else:
+                    st.caption(f"{doc.get('source')} (page {doc.get('page')})")
+                    st.write(doc.get("snippet", ""))
                 st.write("---")
     else:
         # Show backend error messages to help debugging (simple UX for demo)
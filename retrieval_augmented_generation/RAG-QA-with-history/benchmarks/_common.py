@@ -0,0 +1,166 @@
+"""Shared helpers for the offline benchmarks.
+
+Benchmarks run from the project root without a ``.env`` file or network
+access: ``bootstrap`` fills in dummy settings and puts ``src`` on the import
+path, and the fakes below stand in for the Groq LLM and the vector store.
+"""
+
+import hashlib
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+_DUMMY_SETTINGS = {
+    "RAG_ROOT": PROJECT_ROOT,
+    "APP_NAME": "RAG benchmark",
+    "APP_VERSION": "0.1",
+    "LOG_LEVEL": "WARNING",
+    "RAG_API_URL": "http://localhost:8000/api/rag",
+    "GROQ_API_KEY": "gsk_benchmark",
+    "LLM_MODEL": "fake-llm",
+    "HF_TOKEN": "hf_benchmark",
+    "EMBEDDING_MODEL": "fake-embeddings",
+}
+
+
+def bootstrap():
+    """Provide dummy settings and make ``src`` importable."""
+    for key, value in _DUMMY_SETTINGS.items():
+        os.environ.setdefault(key, value)
+    src_dir = os.path.join(PROJECT_ROOT, "src")
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+
+
+def make_fake_llm(responses: List[str] = None, latency: float = 0.0):
+    """Return a deterministic chat model that needs no network access.
+
+    ``latency`` seconds are slept per call to stand in for the LLM round
+    trip; streamed answers additionally honour the model's ``sleep``.
+    """
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    class _FakeChatModel(FakeListChatModel):
+        def _call(self, *args, **kwargs):
+            if latency:
+                time.sleep(latency)
+            return super()._call(*args, **kwargs)
+
+    return _FakeChatModel(responses=responses or ["This is a canned benchmark answer."])
+
+
+class FakeHFEmbeddings:
+    """Offline stand-in for ``HuggingFaceEmbeddings``.
+
+    Vectors are derived from a hash of the text, so they are deterministic
+    and identical texts embed identically. ``latency`` seconds are slept per
+    forward pass (per call, regardless of batch size).
+    """
+
+    dim = 384
+    latency = 0.0
+
+    def __init__(self, model_name: str = "fake-embeddings", **kwargs):
+        self.model_name = model_name
+        self.encode_kwargs = {}
+        self.query_encode_kwargs = {}
+
+    def _vector(self, text: str) -> List[float]:
+        import numpy as np
+
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).tolist()
+
+    def _embed(self, texts: List[str], encode_kwargs: dict) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.encode_kwargs)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], self.query_encode_kwargs)[0]
+
+
+def install_fake_embeddings(latency: float = 0.0):
+    """Make ``VectorStoreManager`` use ``FakeHFEmbeddings``; call before it is built."""
+    import services.vectorstore as vectorstore
+
+    FakeHFEmbeddings.latency = latency
+    vectorstore.HuggingFaceEmbeddings = FakeHFEmbeddings
+
+
+class FakeVectorStoreManager:
+    """Minimal stand-in for ``VectorStoreManager`` with a fixed corpus."""
+
+    def __init__(self, texts: List[str] = None):
+        from langchain_core.documents import Document
+
+        texts = texts or [f"Benchmark chunk number {i}." for i in range(3)]
+        self.namespace = "default"
+        self.docs = [Document(page_content=t, metadata={"source": "bench.pdf", "page": i})
+                     for i, t in enumerate(texts)]
+
+    def as_retriever(self, search_kwargs=None, mode=None):
+        from langchain_core.retrievers import BaseRetriever
+
+        docs = self.docs
+        k = (search_kwargs or {}).get("k", 3)
+
+        class _FixedRetriever(BaseRetriever):
+            def _get_relevant_documents(self, query, *, run_manager=None):
+                return docs[:k]
+
+        return _FixedRetriever()
+
+    def count(self):
+        return len(self.docs)
+
+    def embed_query(self, text: str):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        return DeterministicFakeEmbedding(size=64).embed_query(text)
+
+    def add_change_listener(self, callback):
+        pass
+
+    # Namespace API used by ``ChainRegistry``: every namespace is this corpus.
+    def get(self, namespace=None, create=False):
+        return self
+
+    def add_evict_listener(self, callback):
+        pass
+
+
+def time_calls(fn: Callable[[], object], n: int) -> List[float]:
+    """Call ``fn`` ``n`` times and return per-call latencies in milliseconds."""
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Return the ``q`` quantile (0-1) of an already sorted list."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Return mean/p50/p95/p99 of a list of millisecond latencies."""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(percentile(ordered, 0.50), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+    }
@@ -0,0 +1,46 @@
+"""Per-request latency of rebuilding the RAG chain vs. reusing it.
+
+Usage (from the project root):
+    python benchmarks/bench_chain_reuse.py --requests 200
+"""
+
+import argparse
+import json
+
+from _common import FakeVectorStoreManager, bootstrap, make_fake_llm, summarize, time_calls
+
+bootstrap()
+
+from services.rag_chain import ChainRegistry, build_chain  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    vector_mgr = FakeVectorStoreManager()
+    payload = {"input": "What is attention?"}
+
+    def per_request_build():
+        # Old behaviour: a new client and chain for every request.
+        chain = build_chain(vector_mgr, llm=make_fake_llm())
+        chain.invoke(payload, config={"configurable": {"session_id": "bench-build"}})
+
+    shared_llm = make_fake_llm()
+    registry = ChainRegistry(vector_mgr, llm_factory=lambda _model: shared_llm)
+    registry.warm_up()
+
+    def registry_reuse():
+        registry.get().invoke(payload, config={"configurable": {"session_id": "bench-reuse"}})
+
+    results = {
+        "requests": args.requests,
+        "build_per_request": summarize(time_calls(per_request_build, args.requests)),
+        "registry_reuse": summarize(time_calls(registry_reuse, args.requests)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Size and serialisation time of ``/chat`` response bodies.
+
+Builds ``/chat`` responses from chunks of the bundled ``data/attention.pdf``
+and ``data/LLM.pdf`` (``--k`` chunks per answer, split 2000/100 characters
+as before token-aware chunking, or with the current splitter via
+``--chunking tokens``) and serialises each one three ways:
+  - ``full_pydantic``: the previous path, ``Response(...).model_dump()``,
+      FastAPI's ``jsonable_encoder`` and ``JSONResponse``.
+  - ``full_fast``: ``context="full"`` through ``api.responses``.
+  - ``compact_fast``: ``context="compact"`` (id, source, page, snippet).
+
+Reports body bytes, gzipped bytes (as ``GZipMiddleware`` sends them) and
+serialisation time per response.
+
+Usage (from the project root):
+    python benchmarks/bench_chat_payload.py --responses 200 --k 3
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import tempfile
+
+os.environ.setdefault("RAG_ROOT", tempfile.mkdtemp(prefix="rag-bench-"))
+os.environ.setdefault("CHUNK_TOKENIZER", "approx")
+
+from _common import DATA_DIR, bootstrap, summarize, time_calls  # noqa: E402
+
+bootstrap()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from api.responses import FastJSONResponse, context_payload  # noqa: E402
+from api.schemas import Response  # noqa: E402
+from utils.pdf_loader import iter_pdf_documents  # noqa: E402
+
+PDFS = ["attention.pdf", "LLM.pdf"]
+ANSWER = ("The Transformer replaces recurrence with multi-head self-attention, which lets every "
+          "position attend to every other position in a constant number of sequential steps.")
+
+
+def full_pydantic(docs):
+    payload = Response(status="ok", answer=ANSWER, context=docs).model_dump()
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def full_fast(docs):
+    return FastJSONResponse({"status": "ok", "answer": ANSWER, "context": context_payload(docs, "full")}).body
+
+
+def compact_fast(docs):
+    return FastJSONResponse({"status": "ok", "answer": ANSWER, "context": context_payload(docs, "compact")}).body
+
+
+def load_chunks(chunking):
+    sources = []
+    for name in PDFS:
+        with open(os.path.join(DATA_DIR, name), "rb") as f:
+            sources.append((name, f.read()))
+    pages = list(iter_pdf_documents(sources))
+    if chunking == "tokens":
+        from services.text_splitter import split_documents
+
+        chunks = split_documents(pages)
+    else:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        chunks = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=100).split_documents(pages)
+    from services.vectorstore import chunk_id
+
+    for chunk in chunks:
+        chunk.id = chunk_id(chunk.page_content)
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--chunking", choices=["chars", "tokens"], default="chars")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.chunking)
+    random.seed(args.seed)
+    contexts = [random.sample(chunks, args.k) for _ in range(args.responses)]
+
+    results = {"responses": len(contexts), "k": args.k, "chunking": args.chunking,
+               "answer_bytes": len(json.dumps(ANSWER).encode())}
+    for serialise in (full_pydantic, full_fast, compact_fast):
+        bodies = [serialise(docs) for docs in contexts]
+        it = iter(contexts * 2)
+        latencies = time_calls(lambda: serialise(next(it)), len(contexts))
+        results[serialise.__name__] = {
+            "avg_bytes": round(statistics.mean(map(len, bodies))),
+            "avg_gzip_bytes": round(statistics.mean(len(gzip.compress(body, 9)) for body in bodies)),
+            **summarize(latencies),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Throughput of chunking: per-call character splitter vs. shared token splitter.
+
+Parses the bundled ``data/attention.pdf`` and ``data/LLM.pdf`` once, then
+splits the pages the old way (a new 2000/100 character splitter per page)
+and with the shared token-aware splitter from ``services.text_splitter``,
+and reports chunks and pages per second plus the size of the chunks in
+tokens of ``--tokenizer``. Chunks longer than the tokenizer's limit are
+truncated by the embedding model, so ``over_limit`` should be 0.
+
+``--tokenizer approx`` needs no download; any other value is loaded with
+``transformers.AutoTokenizer`` (locally or from the Hub).
+
+Usage (from the project root):
+    python benchmarks/bench_chunking.py --rounds 5 \\
+        --tokenizer sentence-transformers/all-MiniLM-L6-v2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from _common import DATA_DIR, bootstrap
+
+PDFS = ["attention.pdf", "LLM.pdf"]
+
+
+def per_call_character_splitter(pages):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    chunks = []
+    for page in pages:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=100)
+        chunks.extend(splitter.split_documents([page]))
+    return chunks
+
+
+def shared_token_splitter(pages):
+    from services.text_splitter import iter_split_documents
+
+    return list(iter_split_documents(pages))
+
+
+def measure(splitter, pages, rounds, counter, max_length):
+    chunks, elapsed = [], 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        chunks = splitter(pages)
+        elapsed += time.perf_counter() - start
+    tokens = [counter(chunk.page_content) for chunk in chunks]
+    return {
+        "chunks": len(chunks),
+        "seconds": round(elapsed / rounds, 4),
+        "chunks_per_sec": round(len(chunks) * rounds / elapsed, 1),
+        "pages_per_sec": round(len(pages) * rounds / elapsed, 1),
+        "avg_tokens": round(statistics.mean(tokens), 1),
+        "max_tokens": max(tokens),
+        "over_limit": sum(t > max_length for t in tokens) if max_length else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--tokenizer", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--chunk-size", type=int, help="tokens, defaults to CHUNK_SIZE")
+    parser.add_argument("--chunk-overlap", type=int, help="tokens, defaults to CHUNK_OVERLAP")
+    args = parser.parse_args()
+
+    os.environ["CHUNK_TOKENIZER"] = args.tokenizer
+    if args.chunk_size:
+        os.environ["CHUNK_SIZE"] = str(args.chunk_size)
+    if args.chunk_overlap is not None:
+        os.environ["CHUNK_OVERLAP"] = str(args.chunk_overlap)
+    bootstrap()
+
+    from services.text_splitter import _get_counter, resolve_chunking
+    from utils.pdf_loader import iter_pdf_documents
+
+    sources = []
+    for name in PDFS:
+        with open(os.path.join(DATA_DIR, name), "rb") as f:
+            sources.append((name, f.read()))
+    pages = list(iter_pdf_documents(sources))
+
+    counter, max_length = _get_counter()
+    chunk_size, chunk_overlap = resolve_chunking()
+    results = {
+        "files": PDFS,
+        "pages": len(pages),
+        "tokenizer": args.tokenizer,
+        "max_length": max_length,
+        "per_call_character_2000_100": measure(per_call_character_splitter, pages, args.rounds,
+                                               counter, max_length),
+        f"shared_token_{chunk_size}_{chunk_overlap}": measure(shared_token_splitter, pages, args.rounds,
+                                                              counter, max_length),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
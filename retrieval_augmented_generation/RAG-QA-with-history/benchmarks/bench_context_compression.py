@@ -0,0 +1,117 @@
+"""Prompt tokens saved by context compression, and what it costs.
+
+Splits the bundled ``data/attention.pdf`` and ``data/LLM.pdf`` into chunks,
+indexes them with BM25 and, for sampled sentences, retrieves ``--k``
+chunks with the sentence's rarest terms as the query (as in
+``bench_hybrid_retrieval.py``). The retrieved context is then compressed
+for each ``--budgets`` token budget; the report gives prompt context tokens
+before and after, compression latency, and how often the sentence the
+query came from survives compression (``kept_source_sentence``, bounded by
+``retrieved_source_sentence`` for the uncompressed context).
+
+``--mode lexical`` needs nothing else; ``--mode embedding`` loads
+``--embedding-model`` (locally or from the Hub).
+
+Usage (from the project root):
+    python benchmarks/bench_context_compression.py --queries 200 --budgets 128 256 512
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+
+os.environ.setdefault("RAG_ROOT", tempfile.mkdtemp(prefix="rag-bench-"))
+os.environ.setdefault("CHUNK_TOKENIZER", "approx")
+
+from _common import DATA_DIR, bootstrap, summarize, time_calls  # noqa: E402
+
+bootstrap()
+
+from services.bm25_index import BM25Index, tokenize  # noqa: E402
+from services.context_compression import ContextCompressor, split_sentences  # noqa: E402
+from services.text_splitter import split_documents  # noqa: E402
+from services.token_counter import get_token_counter  # noqa: E402
+from services.vectorstore import chunk_id  # noqa: E402
+from utils.pdf_loader import iter_pdf_documents  # noqa: E402
+
+PDFS = ["attention.pdf", "LLM.pdf"]
+
+
+def rare_term_query(text, bm25, n_terms=3):
+    terms = {t for t in tokenize(text) if len(t) > 2}
+    ranked = sorted(terms, key=lambda t: len(bm25.postings.get(t, ())))
+    return " ".join(ranked[:n_terms])
+
+
+def contains(docs, sentence):
+    return any(sentence in " ".join(doc.page_content.split()) for doc in docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--mode", choices=["lexical", "embedding"], default="lexical")
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sources = []
+    for name in PDFS:
+        with open(os.path.join(DATA_DIR, name), "rb") as f:
+            sources.append((name, f.read()))
+    chunks = split_documents(iter_pdf_documents(sources))
+    by_id = {chunk_id(doc.page_content): doc for doc in chunks}
+    bm25 = BM25Index(os.path.join(tempfile.mkdtemp(prefix="rag-bench-"), "bm25_index.json"))
+    bm25.add(list(by_id), [doc.page_content for doc in by_id.values()], persist=False)
+
+    embeddings = None
+    if args.mode == "embedding":
+        from services.vectorstore import build_embeddings
+
+        embeddings = build_embeddings(args.embedding_model)
+
+    random.seed(args.seed)
+    cases = []
+    for doc in random.sample(chunks, min(args.queries, len(chunks))):
+        sentence = random.choice(split_sentences(doc.page_content))
+        query = rare_term_query(sentence, bm25)
+        context = [by_id[i] for i, _ in bm25.search(query, args.k)]
+        cases.append((query, sentence, context))
+
+    counter = get_token_counter()
+    results = {
+        "chunks": len(chunks),
+        "queries": len(cases),
+        "mode": args.mode,
+        "k": args.k,
+        "retrieved_source_sentence": round(sum(contains(c, s) for _, s, c in cases) / len(cases), 3),
+    }
+    for budget in args.budgets:
+        compressor = ContextCompressor(args.mode, token_budget=budget, embeddings=embeddings, bm25=bm25,
+                                       counter=counter)
+        original, kept, survived = [], [], 0
+        for query, sentence, context in cases:
+            compressed = compressor.compress(query, context)
+            original.append(sum(counter(doc.page_content) for doc in context))
+            kept.append(sum(counter(doc.page_content) for doc in compressed))
+            survived += contains(compressed, sentence)
+
+        it = iter(cases * 2)
+        latencies = time_calls(lambda: compressor.compress(*next(it)[::2]), len(cases))
+        results[f"budget_{budget}"] = {
+            "avg_context_tokens": round(statistics.mean(original), 1),
+            "avg_kept_tokens": round(statistics.mean(kept), 1),
+            "tokens_saved_pct": round(100 * (1 - sum(kept) / sum(original)), 1),
+            "kept_source_sentence": round(survived / len(cases), 3),
+            **summarize(latencies),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latency and recall of hybrid BM25 + vector retrieval vs. pure MMR.
+
+Indexes the bundled ``data/attention.pdf`` and ``data/LLM.pdf`` into a
+throw-away store, then queries it with the rarest terms of sampled chunks
+(the kind of exact-term lookup dense search tends to miss). A query counts
+as recalled when its source chunk is among the returned ``k`` documents.
+
+Needs the embedding model locally (or network access to download it).
+
+Usage (from the project root):
+    python benchmarks/bench_hybrid_retrieval.py --queries 100 \\
+        --embedding-model sentence-transformers/all-MiniLM-L6-v2
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+
+os.environ.setdefault("RAG_ROOT", tempfile.mkdtemp(prefix="rag-bench-"))
+
+from _common import DATA_DIR, bootstrap, summarize, time_calls  # noqa: E402
+
+bootstrap()
+
+from services.bm25_index import tokenize  # noqa: E402
+from services.text_splitter import split_documents  # noqa: E402
+from services.vectorstore import VectorStoreManager, chunk_id  # noqa: E402
+from utils.pdf_loader import iter_pdf_documents  # noqa: E402
+
+PDFS = ["attention.pdf", "LLM.pdf"]
+
+
+def rare_term_query(text, bm25, n_terms=3):
+    terms = {t for t in tokenize(text) if len(t) > 2}
+    ranked = sorted(terms, key=lambda t: len(bm25.postings.get(t, ())))
+    return " ".join(ranked[:n_terms])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=10)
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sources = []
+    for name in PDFS:
+        with open(os.path.join(DATA_DIR, name), "rb") as f:
+            sources.append((name, f.read()))
+    chunks = split_documents(iter_pdf_documents(sources))
+
+    vector_mgr = VectorStoreManager(embedding_model=args.embedding_model)
+    vector_mgr.add_documents(chunks)
+
+    random.seed(args.seed)
+    sample = random.sample(chunks, min(args.queries, len(chunks)))
+    queries = [(rare_term_query(doc.page_content, vector_mgr.bm25), chunk_id(doc.page_content))
+               for doc in sample]
+
+    search_kwargs = {"k": args.k, "fetch_k": args.fetch_k, "lambda_mult": 0.4}
+    results = {"chunks": len(chunks), "queries": len(queries)}
+    for mode in ("mmr", "hybrid"):
+        retriever = vector_mgr.as_retriever(search_kwargs, mode=mode)
+        hits = 0
+        for query, expected in queries:
+            docs = retriever.invoke(query)
+            hits += expected in {doc.id or chunk_id(doc.page_content) for doc in docs}
+
+        it = iter(queries * 2)
+        latencies = time_calls(lambda: retriever.invoke(next(it)[0]), len(queries))
+        results[mode] = {f"recall@{args.k}": round(hits / len(queries), 3), **summarize(latencies)}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
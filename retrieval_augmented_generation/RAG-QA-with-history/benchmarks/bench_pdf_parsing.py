@@ -0,0 +1,73 @@
+"""Throughput of PDF parsing: temp file + PyMuPDFLoader vs. in-memory parallel.
+
+Parses the bundled ``data/attention.pdf`` and ``data/LLM.pdf`` with the old
+sequential, temp-file based loader and with ``iter_pdf_documents``, and
+reports pages per second for each.
+
+Usage (from the project root):
+    python benchmarks/bench_pdf_parsing.py --rounds 3
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from _common import DATA_DIR, bootstrap
+
+bootstrap()
+
+from langchain_community.document_loaders import PyMuPDFLoader  # noqa: E402
+from utils.pdf_loader import iter_pdf_documents  # noqa: E402
+
+PDFS = ["attention.pdf", "LLM.pdf"]
+
+
+def temp_file_loader(sources):
+    docs = []
+    for _, content in sources:
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            tmp.write(content)
+            tmp.flush()
+            docs.extend(PyMuPDFLoader(tmp.name).load())
+    return docs
+
+
+def in_memory_loader(sources):
+    return list(iter_pdf_documents(sources))
+
+
+def measure(loader, sources, rounds):
+    pages, elapsed = 0, 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        pages += len(loader(sources))
+        elapsed += time.perf_counter() - start
+    return {"pages": pages // rounds, "seconds": round(elapsed / rounds, 4),
+            "pages_per_sec": round(pages / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    sources = []
+    for name in PDFS:
+        with open(os.path.join(DATA_DIR, name), "rb") as f:
+            sources.append((name, f.read()))
+
+    # Start the process pool before timing so worker spawn is not measured.
+    in_memory_loader(sources[:1])
+
+    results = {
+        "files": PDFS,
+        "temp_file_sequential": measure(temp_file_loader, sources, args.rounds),
+        "in_memory_parallel": measure(in_memory_loader, sources, args.rounds),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
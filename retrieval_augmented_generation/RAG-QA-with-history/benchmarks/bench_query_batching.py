@@ -0,0 +1,67 @@
+"""Query-embedding throughput with and without cross-request micro-batching.
+
+Runs 1, 8 and 32 concurrent clients that each embed distinct questions,
+once calling the HuggingFace model directly (batch size 1 per call) and
+once through ``MicroBatchingEmbeddings``.
+
+Needs the embedding model locally (or network access to download it).
+
+Usage (from the project root):
+    python benchmarks/bench_query_batching.py --queries-per-client 20 \\
+        --embedding-model sentence-transformers/all-MiniLM-L6-v2
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import bootstrap
+
+bootstrap()
+
+from langchain_huggingface import HuggingFaceEmbeddings  # noqa: E402
+from services.embedding_batcher import MicroBatchingEmbeddings, query_batch_fn  # noqa: E402
+
+
+def throughput(embed_query, clients: int, per_client: int) -> float:
+    def client(c):
+        for i in range(per_client):
+            embed_query(f"client {c} question {i}: what does the attention layer compute?")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return round(clients * per_client / (time.perf_counter() - start), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries-per-client", type=int, default=20)
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    hf = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    batched = MicroBatchingEmbeddings(
+        hf,
+        batch_query_fn=query_batch_fn(hf),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    hf.embed_query("warm up")
+    batched.embed_query("warm up")
+
+    results = {}
+    for clients in (1, 8, 32):
+        results[f"{clients}_clients"] = {
+            "direct_qps": throughput(hf.embed_query, clients, args.queries_per_client),
+            "batched_qps": throughput(batched.embed_query, clients, args.queries_per_client),
+        }
+    results["batcher"] = batched.stats()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Start-up cost of the RAG server: ``import main`` and time to ready.
+
+Each round runs in a fresh interpreter and reports how long importing
+``src/main.py`` takes and how long the lifespan handler then needs until
+``/readyz`` succeeds (resources loaded and warmed up).
+
+With ``--fake-embeddings`` the hash-based fake replaces the HuggingFace
+model, so only import and store set-up are measured and no model download
+is needed; without it the configured ``--embedding-model`` is loaded.
+
+Usage (from the project root):
+    python benchmarks/bench_startup.py --rounds 5 --fake-embeddings
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _common import PROJECT_ROOT
+
+_CHILD = r"""
+import asyncio, json, sys, time
+sys.path.insert(0, {benchmarks_dir!r})
+from _common import bootstrap, install_fake_embeddings
+bootstrap()
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+
+if {fake!r}:
+    install_fake_embeddings()
+
+async def ready():
+    start = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        while main.app.state.resources is None:
+            if main.app.state.startup_error:
+                raise RuntimeError(main.app.state.startup_error)
+            await asyncio.sleep(0.01)
+        return time.perf_counter() - start
+
+print(json.dumps({{"import_s": imported, "ready_s": asyncio.run(ready())}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    code = _CHILD.format(benchmarks_dir=os.path.join(PROJECT_ROOT, "benchmarks"), fake=args.fake_embeddings)
+    rounds = []
+    for _ in range(args.rounds):
+        with tempfile.TemporaryDirectory(prefix="rag-startup-") as root:
+            env = dict(os.environ, RAG_ROOT=root, EMBEDDING_MODEL=args.embedding_model)
+            out = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                                 capture_output=True, text=True).stdout
+            rounds.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(json.dumps({
+        key: {
+            "median_s": round(statistics.median(r[key] for r in rounds), 3),
+            "min_s": round(min(r[key] for r in rounds), 3),
+        }
+        for key in ("import_s", "ready_s")
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
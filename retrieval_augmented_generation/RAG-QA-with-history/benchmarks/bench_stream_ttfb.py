@@ -0,0 +1,58 @@
+"""Time-to-first-byte of streamed vs. full answers with a fake streaming LLM.
+
+The fake chat model emits the answer one character at a time and sleeps
+between chunks, so the full-answer latency grows with answer length while
+the streamed first token does not.
+
+Usage (from the project root):
+    python benchmarks/bench_stream_ttfb.py --requests 20 --chunk-delay 0.005
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from _common import FakeVectorStoreManager, bootstrap, make_fake_llm, summarize
+
+bootstrap()
+
+from services.rag_chain import ChainRegistry, astream_answer  # noqa: E402
+
+
+async def run(requests: int, chunk_delay: float):
+    llm = make_fake_llm(["Attention lets every token look at every other token in the sequence."])
+    llm.sleep = chunk_delay
+    registry = ChainRegistry(FakeVectorStoreManager(), llm_factory=lambda _model: llm)
+    chain = registry.warm_up()
+
+    full, first_token = [], []
+    for i in range(requests):
+        start = time.perf_counter()
+        await chain.ainvoke({"input": "What is attention?"},
+                            config={"configurable": {"session_id": f"full-{i}"}})
+        full.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        async for event, _ in astream_answer(chain, "What is attention?", f"stream-{i}"):
+            if event == "token":
+                first_token.append((time.perf_counter() - start) * 1000)
+                break
+
+    return {
+        "requests": requests,
+        "full_answer": summarize(full),
+        "first_token": summarize(first_token),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--chunk-delay", type=float, default=0.005)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.chunk_delay)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Index size, cold-start time and query latency: Chroma vs. local index.
+
+Builds each backend from the same synthetic corpus with deterministic fake
+embeddings (no model download), then reports on-disk size, the time a
+fresh process needs to open the index and answer its first query, and
+warm MMR query latency.
+
+Usage (from the project root):
+    python benchmarks/bench_vector_backends.py --chunks 20000 --dim 768
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import bootstrap, summarize, time_calls
+
+bootstrap()
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from services.vector_backends import create_backend  # noqa: E402
+from services.vectorstore import _dir_size, chunk_id  # noqa: E402
+
+BACKENDS = [("chroma", {}), ("local", {"dtype": "float16"}), ("local", {"dtype": "int8"})]
+
+
+def cold_start(kind, kwargs, persist_dir, dim):
+    """Open the index and run one query in this (fresh) process."""
+    start = time.perf_counter()
+    backend = create_backend(kind, DeterministicFakeEmbedding(size=dim), persist_dir, **kwargs)
+    backend.store.max_marginal_relevance_search("cold start query", k=3, fetch_k=10)
+    print(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--cold-start", nargs=3, metavar=("KIND", "KWARGS", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start:
+        kind, kwargs, persist_dir = args.cold_start
+        cold_start(kind, json.loads(kwargs), persist_dir, args.dim)
+        return
+
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    docs = [Document(page_content=f"synthetic chunk {i} about topic {i % 97}", metadata={"source": "bench.pdf"})
+            for i in range(args.chunks)]
+    ids = [chunk_id(doc.page_content) for doc in docs]
+
+    results = {"chunks": args.chunks, "dim": args.dim}
+    for kind, kwargs in BACKENDS:
+        label = kind + (f"_{kwargs['dtype']}" if kwargs else "")
+        persist_dir = tempfile.mkdtemp(prefix=f"bench-{label}-")
+        backend = create_backend(kind, embeddings, persist_dir, **kwargs)
+
+        start = time.perf_counter()
+        for i in range(0, len(docs), 1000):
+            backend.store.add_documents(docs[i:i + 1000], ids=ids[i:i + 1000])
+        build_s = time.perf_counter() - start
+
+        cold = subprocess.run(
+            [sys.executable, __file__, "--dim", str(args.dim), "--cold-start", kind, json.dumps(kwargs), persist_dir],
+            capture_output=True, text=True, check=True,
+        )
+        queries = iter(range(args.queries))
+        latencies = time_calls(
+            lambda: backend.store.max_marginal_relevance_search(f"query {next(queries)}", k=3, fetch_k=10),
+            args.queries,
+        )
+        results[label] = {
+            "build_s": round(build_s, 2),
+            "disk_mb": round(_dir_size(persist_dir) / 2**20, 2),
+            "cold_start_s": round(float(cold.stdout.strip().splitlines()[-1]), 3),
+            "query": summarize(latencies),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Offline load test of the RAG API.
+
+Runs the FastAPI app from ``src/main.py`` in-process (ASGI transport, no
+sockets) against a throw-away project root, with a deterministic fake LLM
+and hash-based fake embeddings, so it needs no ``.env``, model download or
+network access. Two workloads run one after the other:
+  - chat: ``--chat-clients`` concurrent clients, each with its own session,
+      send ``--chat-requests`` questions in total to ``/chat``.
+  - upload: ``--upload-clients`` concurrent clients upload ``--uploads``
+      generated PDFs to ``/upload`` and poll ``/jobs/{job_id}`` until done.
+
+The report is JSON with p50/p95/p99 latency, throughput and peak RSS per
+workload. ``--save-baseline`` stores it; ``--baseline`` compares against a
+stored report and exits with status 1 when p95/p99 latency, peak RSS or
+throughput is worse than the baseline by more than ``--tolerance``.
+
+Usage (from the project root):
+    python benchmarks/load_test.py --chat-clients 16 --chat-requests 400 \\
+        --uploads 8 --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from _common import bootstrap, install_fake_embeddings, make_fake_llm, summarize
+
+BASE_URL = "http://load-test/api/rag"
+QUESTIONS = [
+    "What is the main contribution of the paper?",
+    "Which dataset is used for evaluation?",
+    "How does the attention layer scale with sequence length?",
+    "What are the limitations mentioned by the authors?",
+    "Summarise the experimental setup.",
+]
+
+# Report keys checked against the baseline: higher latency/RSS or lower
+# throughput than the baseline (beyond the tolerance) is a regression.
+LOWER_IS_BETTER = ("p95_ms", "p99_ms", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size of this process and of its (PDF parsing) children."""
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1),
+    }
+
+
+def make_pdf(index: int, pages: int) -> bytes:
+    """Build a small PDF whose text is unique to ``index``."""
+    import pymupdf
+
+    doc = pymupdf.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Document {index} page {page_no} line {line}: transformers use attention "
+            f"over token sequences, experiment {index * 1000 + page_no * 50 + line}."
+            for line in range(40)
+        )
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def workload_report(latencies: List[float], elapsed: float, errors: int) -> dict:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        **summarize(latencies),
+    }
+
+
+async def run_chat(client, clients: int, total: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        for i in counter:
+            payload = {"session_id": f"load-{worker_id}", "question": QUESTIONS[i % len(QUESTIONS)]}
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload)
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(clients)))
+    return workload_report(latencies, time.perf_counter() - start, errors)
+
+
+async def run_upload(client, clients: int, total: int, pages: int, poll_interval: float) -> dict:
+    pdfs = [make_pdf(i, pages) for i in range(total)]
+    request_latencies: List[float] = []
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.post(
+                "/upload", files=[("files", (f"load_{i}.pdf", pdfs[i], "application/pdf"))])
+            if response.status_code != 202:
+                errors += 1
+                continue
+            request_latencies.append((time.perf_counter() - start) * 1000)
+
+            job_id = response.json()["job_id"]
+            while True:
+                job = (await client.get(f"/jobs/{job_id}")).json()
+                if job["status"] in ("done", "failed"):
+                    break
+                await asyncio.sleep(poll_interval)
+            if job["status"] == "done":
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    report = workload_report(latencies, time.perf_counter() - start, errors)
+    report["request"] = summarize(request_latencies)
+    report["pages_per_upload"] = pages
+    return report
+
+
+async def wait_until_ready(client, timeout: float = 120.0) -> float:
+    """Poll ``/readyz`` and return the seconds it took to become ready."""
+    start = time.perf_counter()
+    while True:
+        response = await client.get("/readyz")
+        if response.status_code == 200:
+            return round(time.perf_counter() - start, 3)
+        if response.json().get("status") == "failed" or time.perf_counter() - start > timeout:
+            raise RuntimeError(f"App did not become ready: {response.json()}")
+        await asyncio.sleep(0.05)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed past ``tolerance``."""
+    regressions = []
+    for workload in ("chat", "upload"):
+        current, base = report.get(workload, {}), baseline.get(workload, {})
+        for key in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if key not in current or not base.get(key):
+                continue
+            if key in LOWER_IS_BETTER:
+                worse = current[key] > base[key] * (1 + tolerance)
+            else:
+                worse = current[key] < base[key] * (1 - tolerance)
+            if worse:
+                regressions.append(f"{workload}.{key}: {current[key]} vs baseline {base[key]}")
+    return regressions
+
+
+async def run(args) -> dict:
+    import httpx
+
+    install_fake_embeddings(latency=args.embed_latency_ms / 1000)
+    import main
+
+    report = {"config": vars(args)}
+    transport = httpx.ASGITransport(app=main.app)
+    # ASGITransport does not send lifespan events, so run the app's
+    # lifespan (resource loading and warm-up) around the workloads.
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url=BASE_URL, timeout=None) as client:
+        report["startup_s"] = await wait_until_ready(client)
+        resources = main.app.state.resources
+        fake_llm = make_fake_llm(latency=args.llm_latency_ms / 1000)
+        resources.chain_registry.llm_factory = lambda model_name: fake_llm
+        resources.chain_registry.invalidate()
+
+        # The chat workload needs something to retrieve.
+        await run_upload(client, 1, 1, args.pages, args.poll_interval)
+        if args.uploads:
+            report["upload"] = await run_upload(client, args.upload_clients, args.uploads,
+                                                args.pages, args.poll_interval)
+            report["upload"]["peak_rss_mb"] = peak_rss_mb()["self"]
+        if args.chat_requests:
+            report["chat"] = await run_chat(client, args.chat_clients, args.chat_requests)
+            report["chat"]["peak_rss_mb"] = peak_rss_mb()["self"]
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-clients", type=int, default=8)
+    parser.add_argument("--chat-requests", type=int, default=200)
+    parser.add_argument("--upload-clients", type=int, default=2)
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=5, help="pages per generated PDF")
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=2.0)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--baseline", help="fail if results regress past this stored report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="write the report to this path")
+    parser.add_argument("--output", help="write the report to this path instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-load-test-") as root:
+        # Everything the app persists (vectors, caches, sessions) goes here.
+        os.environ["RAG_ROOT"] = root
+        bootstrap()
+        report = asyncio.run(run(args))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if regressions:
+        print("Regressions past baseline:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
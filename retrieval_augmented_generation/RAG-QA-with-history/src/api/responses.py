@@ -0,0 +1,70 @@
+"""
+responses.py
+------------
+Serialisation of chat responses.
+- ``FastJSONResponse``: ``ORJSONResponse`` when ``orjson`` is installed,
+  else the standard ``JSONResponse``. Routes that return it directly skip
+  FastAPI's ``jsonable_encoder`` pass as well.
+- ``dumps``: the matching ``str`` serialiser for server-sent events.
+- ``context_payload``: the retrieved chunks in the requested mode:
+  ``"full"`` (page content and all metadata, as before), ``"compact"``
+  (id, source, page and a short snippet) or ``"none"``.
+"""
+
+import json
+from typing import List, Optional
+
+from fastapi.responses import JSONResponse
+from langchain_core.documents import Document
+
+from config import settings
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+
+    def dumps(data) -> str:
+        return orjson.dumps(data).decode()
+except ImportError:  # pragma: no cover - orjson is optional
+    FastJSONResponse = JSONResponse
+
+    def dumps(data) -> str:
+        return json.dumps(data)
+
+CONTEXT_MODES = ("compact", "full", "none")
+
+
+def snippet(text: str, max_chars: Optional[int] = None) -> str:
+    """Return ``text`` on one line, cut at a word boundary to ``max_chars``."""
+    max_chars = max_chars or settings.CHAT_SNIPPET_CHARS
+    # Only the head of a long chunk can end up in the snippet.
+    head = " ".join(text[:2 * max_chars].split())
+    if len(head) <= max_chars:
+        return head if len(text) <= 2 * max_chars else head + "…"
+    cut = head.rfind(" ", 0, max_chars)
+    return head[:cut if cut > 0 else max_chars] + "…"
+
+
+def compact_document(doc: Document) -> dict:
+    """Return the id, source, page and snippet of a retrieved chunk."""
+    doc_id = doc.id
+    if doc_id is None:
+        from services.vectorstore import chunk_id
+
+        doc_id = chunk_id(doc.page_content)
+    return {
+        "id": doc_id,
+        "source": doc.metadata.get("source"),
+        "page": doc.metadata.get("page"),
+        "snippet": snippet(doc.page_content),
+    }
+
+
+def context_payload(docs: List[Document], mode: Optional[str] = None) -> List[dict]:
+    """Serialise retrieved chunks for a response in ``mode`` (default ``CHAT_CONTEXT_MODE``)."""
+    mode = mode or settings.CHAT_CONTEXT_MODE
+    if mode == "none":
+        return []
+    if mode == "full":
+        return [doc.model_dump() for doc in docs]
+    return [compact_document(doc) for doc in docs]
@@ -1,7 +1,8 @@
 """
 base.py — FastAPI app entry
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 from config import settings
 
 base_router = APIRouter(tags=["base"])
@@ -16,3 +17,26 @@ def welcome():
         "app_version": app_version
     }
 
+
+
+@base_router.get("/healthz")
+def healthz():
+    """
+    Liveness: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+
+@base_router.get("/readyz")
+def readyz(request: Request):
+    """
+    Readiness: the embedding model, vector store and chain are loaded and
+    warmed up. Answers 503 while loading or after a failed start-up.
+    """
+    if getattr(request.app.state, "resources", None) is not None:
+        return {"status": "ready"}
+    error = getattr(request.app.state, "startup_error", None)
+    return JSONResponse(
+        status_code=503,
+        content={"status": "failed", "detail": error} if error else {"status": "loading"},
+    )
@@ -1,76 +1,380 @@
 # src/routes/rag.py
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
-from services.vectorstore import VectorStoreManager
-from services.rag_chain import build_chain
-from services.text_splitter import split_documents
-from utils.pdf_loader import load_uploaded_pdfs
-from api.schemas import ChatRequest, Response
+import asyncio
+from contextlib import contextmanager
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional, Union
+from config import settings
+from services.chain_timing import ChainTimer
+from services.resources import RAGResources
+from services.session_store import get_session_store
+from api.responses import FastJSONResponse, context_payload, dumps
+from api.schemas import ChatRequest, CompactResponse, JobStatus, Response, UploadFinish, UploadStart
 from utils.logger import get_logger
+from utils.metrics import REGISTRY, REQUEST_SECONDS
 
 
 rag_router = APIRouter(tags=["rag"])
 logger = get_logger(__name__)
-vector_mgr = VectorStoreManager()
 
 
+def get_resources(request: Request) -> RAGResources:
+    """
+    Return the RAG resources loaded by the app's lifespan handler, or
+    answer 503 while they are still loading.
+    """
+    resources = getattr(request.app.state, "resources", None)
+    if resources is None:
+        raise HTTPException(status_code=503, detail="RAG service is warming up",
+                            headers={"Retry-After": "5"})
+    return resources
+
+
+def _namespace_call(fn, namespace: Optional[str]):
+    """
+    Run ``fn(namespace)`` and map namespace errors to 400 (invalid name)
+    and 404 (unknown namespace).
+    """
+    from services.namespaces import UnknownNamespaceError
+
+    try:
+        return fn(namespace)
+    except UnknownNamespaceError:
+        raise HTTPException(status_code=404, detail=f"Unknown namespace {namespace}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@contextmanager
+def _upload_errors(upload_id: str = ""):
+    """
+    Map chunked-upload errors to 404 (unknown upload), 409 (wrong offset or
+    concurrent part), 413 (too large) and 400 (size or hash mismatch).
+    """
+    from services.uploads import (UploadBusyError, UploadNotFoundError, UploadOffsetError,
+                                  UploadTooLargeError)
 
-@rag_router.post("/upload")
-async def upload_pdfs(files: List[UploadFile] = File(...)):
+    try:
+        yield
+    except UploadNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown upload {upload_id}")
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected)})
+    except UploadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@rag_router.post("/upload", status_code=202)
+async def upload_pdfs(files: List[UploadFile] = File(...), namespace: Optional[str] = Form(None),
+                      chunk_size: Optional[int] = Form(None), chunk_overlap: Optional[int] = Form(None),
+                      resources: RAGResources = Depends(get_resources)):
     """
-    Upload PDFs.
+    Upload PDFs and queue them for background indexing into ``namespace``
+    (created on first upload; the default namespace if omitted).
+    ``chunk_size``/``chunk_overlap`` are in embedding-model tokens and
+    default to the configured ``CHUNK_SIZE``/``CHUNK_OVERLAP``.
+    Files are copied to the upload spool in bounded chunks rather than read
+    into memory; for large files prefer the resumable ``/uploads`` API.
+    Poll ``/jobs/{job_id}`` for progress.
     """
+    # Imported here (already loaded by the lifespan handler) so importing
+    # this module does not pull in PDF parsing and the vector store.
+    from services.ingestion import QueueFullError
+    from services.namespaces import validate_namespace
+    from services.uploads import UploadTooLargeError
+
+    if namespace:
+        _namespace_call(validate_namespace, namespace)
+    spooled = []
     try:
-        docs = load_uploaded_pdfs(files)
-        texts = split_documents(docs, chunk_size = 2000, chunk_overlap=100)
-        # add documents
-        vector_mgr.add_documents(texts)
-        if vector_mgr.count():
-            return {"status": "ok", "message": "Uploaded and indexed PDFs."}
+        with REQUEST_SECONDS.time(endpoint="upload"):
+            for f in files:
+                spooled.append(await asyncio.to_thread(resources.uploads.spool, f.filename, f.file))
+            job = resources.ingestion_queue.submit(
+                [(s.filename, s.path) for s in spooled], chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                namespace=namespace, hashes={s.path: s.sha256 for s in spooled})
     except Exception as e:
+        for s in spooled:
+            s.discard()
+        if isinstance(e, QueueFullError):
+            raise HTTPException(status_code=429, detail=str(e))
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
         logger.exception("Upload failed")
         raise HTTPException(status_code=500, detail=str(e))
-    
 
-@rag_router.post("/chat")
-async def chat(request: ChatRequest):
+    return {"status": "queued", "job_id": job.job_id, "namespace": job.namespace}
+
+
+@rag_router.api_route("/files/{sha256}", methods=["GET", "HEAD"])
+async def file_indexed(sha256: str, namespace: Optional[str] = None,
+                       resources: RAGResources = Depends(get_resources)):
+    """
+    Answer 200 if a file with this SHA-256 has been fully indexed into
+    ``namespace`` (the default one if omitted) and 404 otherwise, so clients
+    can skip uploading it again.
+    """
+    vectorstore_mgr = _namespace_call(resources.vector_stores.get, namespace)
+    if not vectorstore_mgr.has_file(sha256):
+        raise HTTPException(status_code=404, detail=f"{sha256} is not indexed")
+    return {"status": "ok", "sha256": sha256.lower(), "namespace": vectorstore_mgr.namespace}
+
+
+@rag_router.post("/uploads", status_code=201)
+async def start_upload(request: UploadStart, resources: RAGResources = Depends(get_resources)):
+    """
+    Start a resumable upload of one PDF. Send its bytes with
+    ``PUT /uploads/{upload_id}/parts?offset=...`` (``part_size`` bytes at a
+    time is a good fit), then call ``POST /uploads/{upload_id}/finish``.
+    ``size`` and ``sha256``, if given, are checked when the upload finishes.
+    """
+    from services.namespaces import validate_namespace
+
+    if request.namespace:
+        _namespace_call(validate_namespace, request.namespace)
+    with _upload_errors():
+        session = resources.uploads.start(request.filename, namespace=request.namespace,
+                                          size=request.size, sha256=request.sha256)
+    return {"status": "ok", **session.to_dict(), "part_size": settings.UPLOAD_PART_SIZE}
+
+
+@rag_router.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str, resources: RAGResources = Depends(get_resources)):
+    """
+    Report how many bytes of an upload have arrived; a client resumes an
+    interrupted upload from ``received``.
+    """
+    with _upload_errors(upload_id):
+        session = resources.uploads.status(upload_id)
+    return {"status": "ok", **session.to_dict()}
+
+
+@rag_router.put("/uploads/{upload_id}/parts")
+async def upload_part(upload_id: str, offset: int, request: Request,
+                      resources: RAGResources = Depends(get_resources)):
+    """
+    Append the raw request body to an upload. ``offset`` must equal the
+    bytes received so far; otherwise the answer is 409 with the expected
+    offset in the ``Upload-Offset`` header.
+    """
+    with _upload_errors(upload_id):
+        session = await resources.uploads.write_part(upload_id, offset, request.stream())
+    return {"status": "ok", "upload_id": upload_id, "received": session.received}
+
+
+@rag_router.post("/uploads/{upload_id}/finish", status_code=202)
+async def finish_upload(upload_id: str, request: Optional[UploadFinish] = None,
+                        resources: RAGResources = Depends(get_resources)):
+    """
+    Complete an upload and queue it for indexing, unless a file with the
+    same content is already indexed in its namespace (answered with 200 and
+    status ``indexed``). Poll ``/jobs/{job_id}`` for progress.
+    """
+    from services.ingestion import QueueFullError
+    from services.text_splitter import resolve_chunking
+
+    options = request or UploadFinish()
+    with _upload_errors(upload_id):
+        chunk_size, chunk_overlap = resolve_chunking(options.chunk_size, options.chunk_overlap)
+        namespace = resources.uploads.status(upload_id).namespace
+        spooled = resources.uploads.finish(upload_id)
+
+    if resources.vector_stores.exists(namespace or settings.DEFAULT_NAMESPACE):
+        if resources.vector_stores.get(namespace).has_file(spooled.sha256):
+            spooled.discard()
+            return JSONResponse({"status": "indexed", "sha256": spooled.sha256,
+                                 "namespace": namespace or settings.DEFAULT_NAMESPACE})
+    try:
+        job = resources.ingestion_queue.submit(
+            [(spooled.filename, spooled.path)], chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+            namespace=namespace, hashes={spooled.path: spooled.sha256})
+    except QueueFullError as e:
+        spooled.discard()
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"status": "queued", "job_id": job.job_id, "namespace": job.namespace, "sha256": spooled.sha256}
+
+
+@rag_router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str, resources: RAGResources = Depends(get_resources)):
+    """
+    Discard an unfinished upload and its spooled bytes.
+    """
+    with _upload_errors(upload_id):
+        resources.uploads.status(upload_id)
+        resources.uploads.abort(upload_id)
+    return {"status": "ok", "message": f"Aborted upload {upload_id}"}
+
+
+@rag_router.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str, resources: RAGResources = Depends(get_resources)):
     """
-    Query RAG with session-aware history
+    Report progress of a background ingestion job.
+    """
+    job = resources.ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+
+@rag_router.get("/stats")
+async def collection_stats(namespace: Optional[str] = None, resources: RAGResources = Depends(get_resources)):
+    """
+    Report chunk count, source-document count, on-disk size and embedding
+    dimension of a namespace's vector store (the default one if omitted).
+    """
+    vectorstore_mgr = _namespace_call(resources.vector_stores.get, namespace)
+    try:
+        return {"status": "ok", **vectorstore_mgr.stats()}
+    except Exception as e:
+        logger.exception("Stats failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@rag_router.get("/namespaces")
+async def list_namespaces(resources: RAGResources = Depends(get_resources)):
+    """
+    List namespaces with their chunk counts and whether they are loaded.
+    """
+    return {"status": "ok", "namespaces": resources.vector_stores.list()}
+
+
+@rag_router.delete("/namespaces/{namespace}")
+async def drop_namespace(namespace: str, resources: RAGResources = Depends(get_resources)):
+    """
+    Delete a namespace and every chunk indexed in it.
     """
-    chain = build_chain(vector_mgr)
     try:
-        response = chain.invoke(
+        _namespace_call(resources.vector_stores.drop, namespace)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "ok", "message": f"Dropped namespace {namespace}"}
+
+
+@rag_router.get("/cache/stats")
+async def cache_stats(resources: RAGResources = Depends(get_resources)):
+    """
+    Report hit/miss counters of the semantic answer cache.
+    """
+    if resources.answer_cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **resources.answer_cache.stats()}
+
+
+@rag_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Expose request, chain-stage and ingestion timings in the Prometheus
+    text format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@rag_router.get("/chunks/{chunk_id}")
+async def get_chunk(chunk_id: str, namespace: Optional[str] = None,
+                    resources: RAGResources = Depends(get_resources)):
+    """
+    Return the full text and metadata of one chunk, e.g. to expand a
+    snippet from a compact ``/chat`` response.
+    """
+    vectorstore_mgr = _namespace_call(resources.vector_stores.get, namespace)
+    docs = vectorstore_mgr.get_chunks([chunk_id])
+    if not docs:
+        raise HTTPException(status_code=404, detail=f"Unknown chunk {chunk_id}")
+    return FastJSONResponse({"status": "ok", **docs[0].model_dump()})
+
+
+@rag_router.post("/chat", response_model=Union[CompactResponse, Response])
+async def chat(request: ChatRequest, resources: RAGResources = Depends(get_resources)):
+    """
+    Query RAG with session-aware history.
+
+    ``context`` selects how retrieved chunks are returned: ``compact`` (id,
+    source, page and snippet; fetch full text from ``/chunks/{id}``),
+    ``full`` (page content and metadata) or ``none``.
+    """
+    chain = _namespace_call(lambda namespace: resources.chain_registry.get(namespace=namespace),
+                            request.namespace)
+    timer = ChainTimer("chat", request.session_id)
+    try:
+        response = await chain.ainvoke(
             {
                 "input": request.question
             },
             config = {
                 "configurable": {
                     "session_id": request.session_id
-                }
+                },
+                "callbacks": [timer]
             }
         )
-        
-        response_payload = Response(
-            status = "ok",
-            answer = response["answer"],
-            context = response["context"]
-        )
-        return response_payload.model_dump()
-        
+        timer.finish()
+
+        # Built as plain dicts and returned directly, which skips response
+        # model validation and ``jsonable_encoder``.
+        return FastJSONResponse({
+            "status": "ok",
+            "answer": response["answer"],
+            "context": context_payload(response["context"], request.context),
+        })
+
     except Exception as e:
+        timer.finish("error")
         logger.exception("Chat error")
         raise HTTPException(status_code=500, detail=str(e))
     
 
+def _sse(event: str, data) -> str:
+    """Format a single server-sent event."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+@rag_router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, resources: RAGResources = Depends(get_resources)):
+    """
+    Query RAG with session-aware history and stream the answer as
+    server-sent events: one ``context`` event (in the request's ``context``
+    mode), then ``token`` events and a final ``done`` event.
+    """
+    from services.rag_chain import astream_answer
+
+    chain = _namespace_call(lambda namespace: resources.chain_registry.get(namespace=namespace),
+                            request.namespace)
+    timer = ChainTimer("chat_stream", request.session_id)
+
+    async def event_stream():
+        try:
+            async for event, data in astream_answer(chain, request.question, request.session_id, [timer]):
+                if event == "context":
+                    data = context_payload(data, request.context)
+                yield _sse(event, data)
+            timer.finish()
+            yield _sse("done", {"status": "ok"})
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band.
+            timer.finish("error")
+            logger.exception("Chat stream error")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @rag_router.post("/reset_session")
 async def reset_session(session_id: str):
     """
     Clear conversation history for a session id.
     """
-    from src.services.rag_chain import CHAT_HISTORIES
-    if session_id in CHAT_HISTORIES:
-        CHAT_HISTORIES.pop(session_id)
-    
+    get_session_store().reset(session_id)
+
     return {
         "status": "ok",
         "message": f"Cleared history for {session_id}"
@@ -1,14 +1,58 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Literal, Optional
 from langchain_core.documents import Document
 
 
 class ChatRequest(BaseModel):
     session_id: str
     question: str
+    namespace: Optional[str] = None
+    # Context detail in the response; ``CHAT_CONTEXT_MODE`` if omitted
+    context: Optional[Literal["compact", "full", "none"]] = None
 
 # i want to design the schema for output
 class Response(BaseModel):
     status: str
     answer: str
-    context: List[Document]
\ No newline at end of file
+    context: List[Document]
+
+
+class ContextSnippet(BaseModel):
+    id: str
+    source: Optional[str] = None
+    page: Optional[int] = None
+    snippet: str
+
+
+class CompactResponse(BaseModel):
+    status: str
+    answer: str
+    context: List[ContextSnippet]
+
+
+class UploadStart(BaseModel):
+    filename: str
+    namespace: Optional[str] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+
+
+class UploadFinish(BaseModel):
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    files: List[str]
+    namespace: str
+    chunk_size: int
+    chunk_overlap: int
+    status: str
+    pages_processed: int
+    chunks_total: int
+    chunks_embedded: int
+    chunks_skipped: int
+    failures: List[Dict[str, str]]
+    created_at: float
+    finished_at: Optional[float] = None
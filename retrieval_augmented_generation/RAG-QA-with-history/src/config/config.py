@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,6 +22,61 @@ class Settings(BaseSettings):
     # =========================== HuggingFace Config ================
     HF_TOKEN: str
     EMBEDDING_MODEL: str
+    EMBEDDING_CACHE_DIR: Optional[str] = None
+    EMBED_BATCH_ENABLED: bool = False
+    EMBED_BATCH_MAX_SIZE: int = 32
+    EMBED_BATCH_WAIT_MS: float = 5.0
+
+    # =========================== Vector Store Config ===============
+    VECTOR_BACKEND: str = "chroma"      # "chroma" or "local"
+    LOCAL_INDEX_DTYPE: str = "float16"  # "float16" or "int8"
+    DEFAULT_NAMESPACE: str = "default"
+    NAMESPACE_MAX_OPEN: int = 32        # namespaces kept open in memory
+    NAMESPACE_IDLE_SECONDS: float = 900 # close namespaces unused this long
+
+    # =========================== Retriever Config ==================
+    RETRIEVER_MODE: str = "mmr"         # "mmr" or "hybrid" (BM25 + vector)
+    RETRIEVER_K: int = 3
+    RETRIEVER_FETCH_K: int = 10
+    RETRIEVER_LAMBDA_MULT: float = 0.4
+    CONTEXT_COMPRESSION: str = "off"    # "off", "lexical" or "embedding"
+    CONTEXT_TOKEN_BUDGET: int = 512     # tokens of context kept when compressing
+
+    # =========================== Ingestion Config ==================
+    INGEST_WORKERS: int = 1
+    INGEST_MAX_PENDING: int = 16
+    INGEST_BATCH_SIZE: int = 64
+    INGEST_JOB_HISTORY: int = 100
+    PDF_PARSE_WORKERS: Optional[int] = None
+    PDF_PAGES_PER_TASK: int = 8
+    CHUNK_SIZE: int = 400               # tokens of CHUNK_TOKENIZER
+    CHUNK_OVERLAP: int = 40
+    CHUNK_TOKENIZER: Optional[str] = None  # defaults to EMBEDDING_MODEL; "approx" = ~4 chars/token
+    UPLOAD_PART_SIZE: int = 4 * 1024 * 1024      # bytes per part suggested to clients
+    UPLOAD_MAX_BYTES: int = 256 * 1024 * 1024
+    UPLOAD_TTL_SECONDS: float = 3600
+
+    # =========================== Session Config ====================
+    SESSION_BACKEND: str = "memory"     # "memory" or "sqlite"
+    SESSION_DB_PATH: Optional[str] = None
+    SESSION_MAX_SESSIONS: int = 1000
+    SESSION_TTL_SECONDS: float = 3600
+    SESSION_MAX_MESSAGES: int = 100
+    HISTORY_MAX_TOKENS: int = 4000
+    HISTORY_TOKENIZER: str = "approx"   # "approx" or a HuggingFace tokenizer name
+
+    # =========================== Answer Cache Config ===============
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+
+    # =========================== Response Config ===================
+    CHAT_CONTEXT_MODE: str = "full"  # "full", "compact" or "none"; requests may override
+    CHAT_SNIPPET_CHARS: int = 240
+    GZIP_MIN_BYTES: int = 1024          # gzip responses at least this large
+
+    # =========================== Metrics Config ====================
+    METRICS_LOG_TIMINGS: bool = False   # log one JSON timing line per request
 
 
     # Load environment file from PROJECT_ROOT/.env when available
@@ -1,13 +1,80 @@
 # src/main.py
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from api.responses import FastJSONResponse
 from api.routes import rag
 from api.routes import base
+from config import settings
+from services.resources import load_resources, warm_up
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def _start_resources(app: FastAPI):
+    """Load and warm up the RAG resources off the event loop."""
+    try:
+        resources = await asyncio.to_thread(load_resources)
+        await asyncio.to_thread(warm_up, resources)
+    except Exception as e:
+        logger.exception("Loading RAG resources failed")
+        app.state.startup_error = str(e)
+        return
+    # Published only once warm, so no request pays first-call costs.
+    app.state.resources = resources
+
+
+async def _evict_idle_namespaces(app: FastAPI, stopping: asyncio.Event):
+    """Close idle namespaces periodically, not only when another one is opened.
+
+    No new eviction starts once ``stopping`` is set.
+    """
+    interval = max(1.0, min(60.0, settings.NAMESPACE_IDLE_SECONDS / 2))
+    while not stopping.is_set():
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stopping.wait(), timeout=interval)
+        if stopping.is_set() or app.state.resources is None:
+            continue
+        try:
+            await asyncio.to_thread(app.state.resources.vector_stores.evict_idle)
+        except Exception:
+            logger.exception("Evicting idle namespaces failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start serving at once and load the heavy resources in the background;
+    ``/readyz`` reports when they are ready.
+    """
+    app.state.resources = None
+    app.state.startup_error = None
+    loading = asyncio.create_task(_start_resources(app))
+    stopping = asyncio.Event()
+    evicting = asyncio.create_task(_evict_idle_namespaces(app, stopping))
+    yield
+    # Not cancelled: that would not stop an eviction already running in its
+    # thread. The task wakes at once and ends after any running eviction,
+    # before the resources are closed.
+    stopping.set()
+    with suppress(asyncio.CancelledError):
+        await evicting
+    await loading
+    if app.state.resources is not None:
+        await asyncio.to_thread(app.state.resources.close)
+
 
-app = FastAPI(title="conversational RAG")
+app = FastAPI(title="conversational RAG", lifespan=lifespan, default_response_class=FastJSONResponse)
+# Compressed only when the client sends ``Accept-Encoding: gzip``; Starlette
+# leaves server-sent events uncompressed so tokens are not buffered.
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_BYTES)
 
 app.include_router(rag.rag_router, prefix="/api/rag")
 app.include_router(base.base_router, prefix="/api/rag")
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
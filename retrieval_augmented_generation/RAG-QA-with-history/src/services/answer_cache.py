@@ -0,0 +1,152 @@
+"""Semantic answer cache for the RAG chain.
+
+Users often ask the same question about the same documents. The cache sits
+between retrieval and the answer LLM call: an entry is keyed by the
+embedding of the rewritten standalone question together with the set of
+retrieved chunk ids, and a stored answer is returned when a new question
+retrieves the same chunks and its embedding is at least ``threshold``
+cosine-similar to a cached one.
+  - Entries are evicted least-recently-used once ``max_size`` is reached.
+  - Entries belong to the namespace they were answered from. A
+      namespace's entries are cleared when chunks are added to it, or it
+      is dropped or closed; other namespaces keep theirs.
+  - Hit and miss counters are exposed through ``stats``.
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import count
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from langchain_core.runnables import Runnable, RunnableBranch, RunnableLambda
+
+from config import settings
+from services.vectorstore import VectorStoreManager, chunk_id
+
+if TYPE_CHECKING:
+    from services.namespaces import NamespaceStores
+
+
+class SemanticAnswerCache:
+    """LRU cache of answers keyed by question embedding and retrieved chunks.
+
+    ``vectorstore_mgr`` is a ``VectorStoreManager`` or ``NamespaceStores``;
+    only its ``embed_query``, ``add_change_listener`` and, if it has one,
+    ``add_evict_listener`` are used.
+    """
+
+    def __init__(self, vectorstore_mgr: Union[VectorStoreManager, "NamespaceStores"], max_size: Optional[int] = None,
+                 threshold: Optional[float] = None):
+        self.vectorstore_mgr = vectorstore_mgr
+        self.max_size = max_size or settings.ANSWER_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else settings.ANSWER_CACHE_THRESHOLD
+        # entry id -> ((namespace, context ids), unit-norm question vector, answer)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._by_context: Dict[Tuple[Optional[str], FrozenSet[str]], Set[int]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        vectorstore_mgr.add_change_listener(self.clear)
+        if hasattr(vectorstore_mgr, "add_evict_listener"):
+            vectorstore_mgr.add_evict_listener(self.clear)
+
+    def lookup(self, question: str, context_ids: FrozenSet[str], namespace: Optional[str] = None) -> dict:
+        """Return ``{"vector", "context_ids", "answer"}`` for a question in ``namespace``.
+
+        ``answer`` is ``None`` on a miss; the other fields are what ``put``
+        needs to store the answer once it has been generated.
+        """
+        vector = _unit(self.vectorstore_mgr.embed_query(question))
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in self._by_context.get((namespace, context_ids), ()):
+                score = float(np.dot(vector, self._entries[entry_id][1]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return {"vector": vector, "context_ids": context_ids, "answer": None}
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return {"vector": vector, "context_ids": context_ids, "answer": self._entries[best_id][2]}
+
+    def put(self, vector: np.ndarray, context_ids: FrozenSet[str], answer: str, namespace: Optional[str] = None):
+        """Store ``answer`` for a question vector and retrieved chunk ids in ``namespace``."""
+        with self._lock:
+            entry_id = next(self._ids)
+            context = (namespace, context_ids)
+            self._entries[entry_id] = (context, vector, answer)
+            self._by_context.setdefault(context, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                old_id, (old_context, _, _) = self._entries.popitem(last=False)
+                self._by_context[old_context].discard(old_id)
+                if not self._by_context[old_context]:
+                    del self._by_context[old_context]
+
+    def clear(self, namespace: Optional[str] = None):
+        """Drop the entries of ``namespace`` (all if ``None``), e.g. after it has changed."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._by_context.clear()
+            else:
+                for context in [c for c in self._by_context if c[0] == namespace]:
+                    for entry_id in self._by_context.pop(context):
+                        del self._entries[entry_id]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    def wrap(self, retrieval: Runnable, answer_chain: Runnable, namespace: Optional[str] = None) -> Runnable:
+        """Put the cache between ``retrieval`` and ``answer_chain``.
+
+        ``retrieval`` must output ``standalone_question`` and ``context``,
+        retrieved from ``namespace``.
+        The result adds ``answer`` and a boolean ``cached`` to its output;
+        on a miss the answer still streams from ``answer_chain``.
+        """
+        def _lookup(x: dict) -> dict:
+            return self.lookup(x["standalone_question"], _context_ids(x["context"]), namespace)
+
+        def _remember(x: dict) -> bool:
+            entry = x["answer_cache"]
+            if entry["answer"] is not None:
+                return True
+            self.put(entry["vector"], entry["context_ids"], x["answer"], namespace)
+            return False
+
+        answer = RunnableBranch(
+            (lambda x: x["answer_cache"]["answer"] is not None, lambda x: x["answer_cache"]["answer"]),
+            answer_chain,
+        )
+        return (
+            retrieval
+            .assign(answer_cache=RunnableLambda(_lookup).with_config(run_name="answer_cache_lookup"))
+            .assign(answer=answer)
+            .assign(cached=RunnableLambda(_remember).with_config(run_name="answer_cache_store"))
+        )
+
+
+def _context_ids(docs: List) -> FrozenSet[str]:
+    return frozenset(doc.id or chunk_id(doc.page_content) for doc in docs)
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
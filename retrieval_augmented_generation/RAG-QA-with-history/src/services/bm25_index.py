@@ -0,0 +1,193 @@
+"""In-process BM25 inverted index and a hybrid (BM25 + vector) retriever.
+
+Dense MMR search often misses exact terms in technical PDFs (model names,
+equation labels, acronyms). ``BM25Index`` is a compact inverted index over
+chunk ids that ``VectorStoreManager.add_documents`` updates incrementally
+and persists inside ``persist_dir``: a JSON snapshot plus an append-only
+JSONL log of the documents added since, folded into the snapshot on load.
+An add therefore writes only its own postings, not the whole index. ``HybridRetriever`` fuses the
+lexical and vector candidate lists with reciprocal rank fusion (RRF) and
+loads only the winning chunks from the store.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+_TOKEN_RE = re.compile(r"\w+(?:[-.]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase ``text`` and split it into terms, keeping ``gpt-4``/``3.2`` intact."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Incrementally maintained Okapi BM25 index over chunk ids.
+
+    Only ids, lengths and postings are stored; chunk text stays in the
+    vector store.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.log_path = path + ".log"
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_lens: List[int] = []
+        # term -> {doc index: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._index_of: Dict[str, int] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._index_of
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], persist: bool = True):
+        """Index ``texts`` under ``ids``; ids already indexed are skipped.
+
+        With ``persist`` the new documents are appended to the log.
+        """
+        with self._lock:
+            added = []
+            for doc_id, text in zip(ids, texts):
+                if doc_id in self._index_of:
+                    continue
+                terms = Counter(tokenize(text))
+                self._add_terms(doc_id, terms)
+                added.append((doc_id, terms))
+            if persist and added:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps({"id": doc_id, "tf": terms}, separators=(",", ":")) + "\n"
+                                    for doc_id, terms in added))
+
+    def _add_terms(self, doc_id: str, terms: Dict[str, int]):
+        idx = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_lens.append(sum(terms.values()))
+        self._index_of[doc_id] = idx
+        self._total_len += self.doc_lens[-1]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[idx] = tf
+
+    def idf(self, term: str) -> float:
+        """Return the inverse document frequency of ``term`` in the index."""
+        with self._lock:
+            n = len(self.doc_ids)
+            df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(chunk id, score)`` pairs, best first."""
+        with self._lock:
+            n = len(self.doc_ids)
+            if not n:
+                return []
+            avg_len = self._total_len / n
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for idx, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lens[idx] / avg_len)
+                    scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / norm
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self.doc_ids[idx], score) for idx, score in best]
+
+    def save(self):
+        """Write the whole index to ``path`` atomically and empty the log."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"doc_ids": self.doc_ids, "doc_lens": self.doc_lens,
+                           "postings": self.postings}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.doc_ids = data["doc_ids"]
+            self.doc_lens = data["doc_lens"]
+            # JSON object keys are strings; restore integer doc indexes.
+            self.postings = {term: {int(i): tf for i, tf in p.items()} for term, p in data["postings"].items()}
+            self._index_of = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+            self._total_len = sum(self.doc_lens)
+
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break   # torn last line of an interrupted append
+                if record["id"] not in self._index_of:
+                    self._add_terms(record["id"], record["tf"])
+        self.save()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = 60) -> List[str]:
+    """Fuse ranked id lists; each id scores ``sum(1 / (rrf_k + rank))``."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever fusing vector similarity and BM25 candidates with RRF.
+
+    Attributes:
+        vector_search: ``(query, n) -> List[Document]`` dense search whose
+            documents carry their chunk id in ``Document.id``.
+        bm25: The lexical index.
+        get_by_ids: Loads chunks that only the lexical side returned.
+        k: Number of documents returned.
+        candidates: Candidates taken from each side before fusion.
+        rrf_k: RRF damping constant.
+    """
+
+    vector_search: Callable[[str, int], List[Document]]
+    bm25: BM25Index
+    get_by_ids: Callable[[List[str]], List[Document]]
+    k: int = 3
+    candidates: int = 10
+    rrf_k: int = 60
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = self.vector_search(query, self.candidates)
+        lexical = [doc_id for doc_id, _ in self.bm25.search(query, self.candidates)]
+
+        by_id = {doc.id: doc for doc in dense}
+        fused = reciprocal_rank_fusion([[doc.id for doc in dense], lexical], self.rrf_k)[:self.k]
+
+        missing = [doc_id for doc_id in fused if doc_id not in by_id]
+        if missing:
+            by_id.update({doc.id: doc for doc in self.get_by_ids(missing)})
+        return [by_id[doc_id] for doc_id in fused if doc_id in by_id]
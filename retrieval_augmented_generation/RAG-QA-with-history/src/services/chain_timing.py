@@ -0,0 +1,134 @@
+"""Per-stage timing of the RAG chain.
+
+``ChainTimer`` is a LangChain callback handler passed with each ``/chat``
+request. It times the named runnables of the chain built by
+``services.rag_chain.build_chain``:
+  - ``history``: loading the session's (token-budgeted) chat history.
+  - ``rewrite``: rewriting the question into a standalone one.
+  - ``retrieve``: fetching context chunks.
+  - ``cache_lookup``: consulting the semantic answer cache, when enabled.
+  - ``compress``: cutting the context down to the question's best
+      sentences, when ``CONTEXT_COMPRESSION`` is enabled.
+  - ``stuff``: formatting the retrieved documents into the prompt.
+  - ``answer``: the whole answer step (stuffing, prompt and LLM call).
+  - ``llm``: every LLM call, with prompt/completion token counts.
+
+Timings are recorded in the ``utils.metrics`` histograms as each stage
+ends; ``finish`` additionally logs them as one structured JSON line per
+request when ``METRICS_LOG_TIMINGS`` is enabled.
+"""
+
+import json
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config import settings
+from utils.logger import get_logger
+from utils.metrics import CHAIN_STAGE_SECONDS, LLM_TOKENS, REQUEST_SECONDS, RETRIEVED_CHUNKS
+
+logger = get_logger("rag.timing")
+
+# Run names set in ``build_chain`` (and by LangChain) -> stage label.
+STAGES = {
+    "load_history": "history",
+    "rewrite_question": "rewrite",
+    "retrieve_documents": "retrieve",
+    "answer_cache_lookup": "cache_lookup",
+    "compress_context": "compress",
+    "format_inputs": "stuff",
+    "stuff_documents_chain": "answer",
+}
+
+
+class ChainTimer(BaseCallbackHandler):
+    """Collect stage timings and token/chunk counts of one chain run."""
+
+    # Run callbacks on the event loop instead of a thread pool so the
+    # timestamps are taken when the stage actually starts and ends.
+    run_inline = True
+
+    def __init__(self, endpoint: str, session_id: Optional[str] = None):
+        self.endpoint = endpoint
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.chunks = 0
+        self._open: Dict[UUID, tuple] = {}
+
+    # ----------------------------------------------------------------- chains
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID, **kwargs: Any):
+        stage = STAGES.get(kwargs.get("name") or (serialized or {}).get("name"))
+        if stage:
+            self._open[run_id] = (stage, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    # -------------------------------------------------------------- retriever
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any):
+        self.chunks += len(documents)
+        RETRIEVED_CHUNKS.observe(len(documents))
+
+    # -------------------------------------------------------------------- LLM
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs: Any):
+        self._open[run_id] = ("llm", time.perf_counter())
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID, **kwargs: Any):
+        self._open[run_id] = ("llm", time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+        usage = _usage(response)
+        for kind, count in usage.items():
+            self.tokens[kind] += count
+            LLM_TOKENS.observe(count, kind=kind)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    # ---------------------------------------------------------------- request
+    def finish(self, status: str = "ok"):
+        """Record the request total and log the structured timing line."""
+        total = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(total, endpoint=self.endpoint)
+        if settings.METRICS_LOG_TIMINGS:
+            logger.info(json.dumps({
+                "event": "request_timing",
+                "endpoint": self.endpoint,
+                "session_id": self.session_id,
+                "status": status,
+                "total_ms": round(total * 1000, 2),
+                "stages_ms": {stage: round(s * 1000, 2) for stage, s in self.stages.items()},
+                "prompt_tokens": self.tokens["prompt"],
+                "completion_tokens": self.tokens["completion"],
+                "chunks": self.chunks,
+            }))
+
+    def _close(self, run_id: UUID):
+        opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        stage, start = opened
+        elapsed = time.perf_counter() - start
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+        CHAIN_STAGE_SECONDS.observe(elapsed, stage=stage)
+
+
+def _usage(response) -> Dict[str, int]:
+    """Return prompt/completion token counts reported for an LLM call."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"prompt": usage.get("input_tokens", 0), "completion": usage.get("output_tokens", 0)}
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt": usage.get("prompt_tokens", 0), "completion": usage.get("completion_tokens", 0)}
+    return {}
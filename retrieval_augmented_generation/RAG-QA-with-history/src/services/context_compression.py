@@ -0,0 +1,184 @@
+"""Query-focused compression of the retrieved context.
+
+The answer prompt used to receive every retrieved chunk in full, so prompt
+size (and with it LLM latency and cost) followed chunk length rather than
+what the question needs. ``ContextCompressor`` sits between retrieval and
+the answer LLM call and keeps only the sentences that best match the
+(rewritten) question, within a token budget:
+  - ``"lexical"``: BM25 scoring of each sentence against the question,
+      with term weights (IDF) from the namespace's ``BM25Index`` when
+      available. No model call.
+  - ``"embedding"``: cosine similarity between the question embedding
+      (memoized when retrieval embedded the same question) and sentence
+      embeddings, which go through the on-disk embedding cache, so
+      sentences of chunks seen before are not embedded again.
+
+Sentences are picked best first until ``CONTEXT_TOKEN_BUDGET`` tokens
+(counted with ``services.token_counter``) are used, then put back in their
+original order; chunks left without a sentence are dropped. Context that
+already fits the budget is passed through unchanged. Only the prompt is
+compressed: the chain still returns the full retrieved chunks as
+``context``. Token counts before and after are added to the
+``rag_context_tokens_total`` counter.
+"""
+
+import math
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import settings
+from services.bm25_index import BM25Index, tokenize
+from services.token_counter import TokenCounter, get_token_counter
+from utils.metrics import CONTEXT_TOKENS
+
+COMPRESSION_MODES = ("off", "lexical", "embedding")
+
+# A sentence ends at ., ! or ? followed by whitespace and an upper-case
+# letter, digit, quote or bracket (PDF text breaks lines mid-sentence).
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split ``text`` into sentences, joining lines broken by PDF extraction."""
+    text = _WHITESPACE.sub(" ", text).strip()
+    return [sentence for sentence in _SENTENCE_END.split(text) if sentence]
+
+
+class ContextCompressor:
+    """Keep the sentences of retrieved chunks most relevant to the question."""
+
+    def __init__(self, mode: Optional[str] = None, token_budget: Optional[int] = None,
+                 embeddings=None, bm25: Optional[BM25Index] = None,
+                 counter: Optional[TokenCounter] = None, k1: float = 1.5, b: float = 0.75):
+        self.mode = mode or settings.CONTEXT_COMPRESSION
+        if self.mode not in COMPRESSION_MODES[1:]:
+            raise ValueError(f"Unknown context compression mode {self.mode!r}")
+        if self.mode == "embedding" and embeddings is None:
+            raise ValueError("Embedding compression needs the store's embeddings")
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.embeddings = embeddings
+        self.bm25 = bm25
+        self.counter = counter or get_token_counter()
+        self.k1 = k1
+        self.b = b
+
+    def __call__(self, inputs: dict) -> List[Document]:
+        """Compress ``inputs["context"]`` for the chain's question."""
+        question = inputs.get("standalone_question") or inputs["input"]
+        return self.compress(question, inputs["context"])
+
+    def compress(self, question: str, docs: List[Document]) -> List[Document]:
+        """Return ``docs`` cut down to their best sentences within the token budget."""
+        # (doc index, sentence, tokens) in document order
+        sentences: List[Tuple[int, str, int]] = [
+            (i, sentence, self.counter(sentence))
+            for i, doc in enumerate(docs)
+            for sentence in split_sentences(doc.page_content)
+        ]
+        original = sum(self.counter(doc.page_content) for doc in docs)
+        if original <= self.token_budget or not sentences:
+            CONTEXT_TOKENS.inc(original, kind="original")
+            CONTEXT_TOKENS.inc(original, kind="kept")
+            return docs
+
+        scores = self._score(question, [sentence for _, sentence, _ in sentences])
+        ranked = sorted(range(len(sentences)), key=lambda j: scores[j], reverse=True)
+        # sentence index -> kept text. The best sentence is always kept, cut
+        # to the budget if needed: unpunctuated PDF text (tables, lists) can
+        # make a whole chunk one "sentence" larger than the budget.
+        keep: Dict[int, str] = {}
+        best_text = self._truncate(sentences[ranked[0]][1], self.token_budget)
+        if best_text:
+            keep[ranked[0]] = best_text
+        used = self.counter(best_text) if best_text else 0
+        for idx in ranked[1:]:
+            tokens = sentences[idx][2]
+            if used + tokens <= self.token_budget:
+                keep[idx] = sentences[idx][1]
+                used += tokens
+        if not keep:
+            CONTEXT_TOKENS.inc(original, kind="original")
+            CONTEXT_TOKENS.inc(original, kind="kept")
+            return docs
+
+        kept_docs = []
+        for i, doc in enumerate(docs):
+            text = " ".join(keep[j] for j, (d, _, _) in enumerate(sentences) if d == i and j in keep)
+            if text:
+                kept_docs.append(Document(page_content=text, metadata=doc.metadata, id=doc.id))
+        kept = sum(self.counter(doc.page_content) for doc in kept_docs)
+        CONTEXT_TOKENS.inc(original, kind="original")
+        CONTEXT_TOKENS.inc(kept, kind="kept")
+        CONTEXT_TOKENS.inc(max(original - kept, 0), kind="saved")
+        return kept_docs
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Return the longest word prefix of ``text`` within ``budget`` tokens."""
+        if self.counter(text) <= budget:
+            return text
+        words = text.split()
+        lo, hi = 0, len(words)   # words[:lo] fits, words[:hi + 1] does not
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.counter(" ".join(words[:mid])) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return " ".join(words[:lo])
+
+    def _score(self, question: str, sentences: List[str]) -> List[float]:
+        if self.mode == "embedding":
+            return self._embedding_scores(question, sentences)
+        return self._lexical_scores(question, sentences)
+
+    def _embedding_scores(self, question: str, sentences: List[str]) -> List[float]:
+        query = _unit_rows(np.asarray([self.embeddings.embed_query(question)], dtype=np.float32))[0]
+        vectors = _unit_rows(np.asarray(self.embeddings.embed_documents(sentences), dtype=np.float32))
+        return (vectors @ query).tolist()
+
+    def _lexical_scores(self, question: str, sentences: List[str]) -> List[float]:
+        terms = set(tokenize(question))
+        tokenized = [tokenize(sentence) for sentence in sentences]
+        avg_len = sum(map(len, tokenized)) / len(tokenized) or 1.0
+        idf = self._idf_function(tokenized)
+        weights = {term: idf(term) for term in terms}
+        scores = []
+        for tokens in tokenized:
+            score = 0.0
+            for term in terms:
+                tf = tokens.count(term)
+                if tf:
+                    norm = tf + self.k1 * (1 - self.b + self.b * len(tokens) / avg_len)
+                    score += weights[term] * tf * (self.k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def _idf_function(self, tokenized: List[List[str]]) -> Callable[[str], float]:
+        # Collection statistics are more telling than those of a handful of
+        # retrieved sentences; fall back to the sentences for an empty index.
+        if self.bm25 is not None and len(self.bm25):
+            return self.bm25.idf
+        n = len(tokenized)
+        sets = [set(tokens) for tokens in tokenized]
+
+        def idf(term: str) -> float:
+            df = sum(term in s for s in sets)
+            return math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return idf
+
+
+def build_compressor(vectorstore_mgr, mode: Optional[str] = None) -> Optional[ContextCompressor]:
+    """Return a compressor for a namespace's store, or ``None`` when compression is off."""
+    mode = mode or settings.CONTEXT_COMPRESSION
+    if mode == "off":
+        return None
+    return ContextCompressor(mode, embeddings=vectorstore_mgr.embeddings, bm25=vectorstore_mgr.bm25)
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
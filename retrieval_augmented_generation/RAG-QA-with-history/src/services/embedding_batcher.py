@@ -0,0 +1,133 @@
+"""Cross-request micro-batching of query embeddings.
+
+Each concurrent ``/chat`` request embeds its standalone question on its own,
+so on CPU the embedding model runs many batch-size-1 forward passes that
+fight over the same cores. ``MicroBatchingEmbeddings`` queues query
+embeddings from all callers and runs them in a single batched forward pass,
+handing each caller its own vector back. A query that finds no other one
+queued runs at once; otherwise the batch waits at most ``max_wait_ms`` (or
+until ``max_batch_size`` queries are queued) for more to arrive.
+
+It implements the LangChain ``Embeddings`` interface, so it plugs in as the
+embedding function of the vector store; document embeddings are passed
+straight through since ingestion already embeds in batches.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BatchQueryFn = Callable[[List[str]], List[List[float]]]
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """``Embeddings`` wrapper that batches concurrent ``embed_query`` calls.
+
+    Args:
+        embeddings: Underlying embeddings, used for documents.
+        batch_query_fn: Embeds a list of queries in one forward pass.
+            Defaults to calling ``embeddings.embed_query`` per text, which
+            keeps behaviour correct but gives no speed-up.
+        max_batch_size: Largest number of queries run together.
+        max_wait_ms: How long a batch waits for more queries; a query
+            that finds none queued behind it runs at once.
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_query_fn: Optional[BatchQueryFn] = None,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.batch_query_fn = batch_query_fn or (lambda texts: [embeddings.embed_query(t) for t in texts])
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.queries = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def submit(self, text: str) -> Future:
+        """Queue ``text`` for the next batch and return a future for its vector."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._worker, name="query-embedding-batcher", daemon=True)
+                    self._thread.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        # A lone query is not held back; queries that piled up during the
+        # previous batch signal concurrent load, so wait for more of them.
+        try:
+            batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            # Identical questions in one window share a single embedding.
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(texts, self.batch_query_fn(texts)))
+            except Exception as e:
+                logger.exception("Batched query embedding failed")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.queries += len(batch)
+            for text, future in batch:
+                future.set_result(vectors[text])
+
+
+def query_batch_fn(embeddings: Embeddings) -> BatchQueryFn:
+    """Return a ``BatchQueryFn`` that embeds queries in one pass of ``embeddings``.
+
+    ``embed_documents`` is called on a copy of ``HuggingFaceEmbeddings``
+    that encodes with its ``query_encode_kwargs``, so a query instruction
+    or prompt still applies; the copy shares the loaded model.
+    """
+    query_kwargs = getattr(embeddings, "query_encode_kwargs", None)
+    if query_kwargs:
+        embeddings = embeddings.model_copy(update={"encode_kwargs": query_kwargs})
+    return embeddings.embed_documents
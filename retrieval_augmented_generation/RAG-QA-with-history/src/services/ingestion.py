@@ -0,0 +1,201 @@
+"""Background ingestion of uploaded PDFs.
+
+``/upload`` used to parse, split, embed and write to Chroma inside the HTTP
+request. This module moves that work onto a small, bounded worker pool:
+``IngestionQueue.submit`` registers an ``IngestionJob`` and returns at once,
+and a worker runs the job as a pipeline of stages per file:
+  - load: parse the PDF (bytes, or a file spooled to disk by
+      ``services.uploads``) lazily into one ``Document`` per page.
+  - split: chunk each page as soon as it is parsed, with the shared
+      token-aware splitter (``services.text_splitter``).
+  - embed + write: hand chunks to the job's namespace
+      (``VectorStoreManager.add_documents``) in fixed-size batches so progress is visible while a large file is indexed,
+      and embedding starts before the whole file has been parsed.
+
+Spooled files are owned by the job and deleted once processed. Files
+submitted with a content hash are recorded in the namespace when they
+were indexed without errors, so later uploads of the same bytes can be
+skipped.
+
+The number of workers and pending jobs are capped so ingestion cannot
+starve ``/chat`` of CPU or memory. Parse and split times are recorded in
+``utils.metrics`` here; embed and write times by ``add_documents``.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from config import settings
+from services.text_splitter import get_text_splitter, resolve_chunking
+from services.namespaces import NamespaceStores
+from services.vectorstore import VectorStoreManager
+from utils.logger import get_logger
+from utils.metrics import INGEST_BATCH_CHUNKS, INGEST_CHUNKS, INGEST_PAGES, INGEST_STAGE_SECONDS
+from utils.pdf_loader import iter_pdf_documents
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the ingestion queue already holds the maximum of jobs."""
+
+
+@dataclass
+class IngestionJob:
+    """Progress of a single upload, as reported by ``/jobs/{job_id}``."""
+
+    job_id: str
+    files: List[str]
+    namespace: str
+    chunk_size: int
+    chunk_overlap: int
+    status: str = QUEUED
+    pages_processed: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_skipped: int = 0
+    failures: List[Dict[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class IngestionQueue:
+    """Bounded worker pool that runs ingestion jobs in the background."""
+
+    def __init__(
+        self,
+        vector_stores: NamespaceStores,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        history: Optional[int] = None,
+    ):
+        self.vector_stores = vector_stores
+        self.max_pending = max_pending or settings.INGEST_MAX_PENDING
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.history = history or settings.INGEST_JOB_HISTORY
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.INGEST_WORKERS,
+            thread_name_prefix="ingest",
+        )
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, files: List[Tuple[str, Union[bytes, str]]], chunk_size: Optional[int] = None,
+               chunk_overlap: Optional[int] = None, namespace: Optional[str] = None,
+               hashes: Optional[Dict[str, str]] = None) -> IngestionJob:
+        """Queue ``files`` for ingestion into ``namespace``.
+
+        ``files`` are ``(filename, content)`` pairs where content is the PDF
+        bytes or the path of a spooled file, which is deleted once processed.
+        ``hashes`` maps spooled file paths to the SHA-256 of their content,
+        recorded via ``VectorStoreManager.record_file`` once the file is
+        indexed (file names can repeat within a job; spool paths cannot).
+        The namespace (default if ``None``) is created when the job starts.
+        ``chunk_size``/``chunk_overlap`` are in tokens and default to
+        ``CHUNK_SIZE``/``CHUNK_OVERLAP``.
+
+        Raises:
+            ValueError: if the chunk parameters are invalid.
+            QueueFullError: if ``max_pending`` jobs are already waiting or running.
+        """
+        chunk_size, chunk_overlap = resolve_chunking(chunk_size, chunk_overlap)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Ingestion queue is full, retry later.")
+            self._pending += 1
+            job = IngestionJob(job_id=uuid.uuid4().hex, files=[name for name, _ in files],
+                               namespace=namespace or settings.DEFAULT_NAMESPACE,
+                               chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+
+        self._executor.submit(self._run, job, files, chunk_size, chunk_overlap, hashes or {})
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Return the job with ``job_id`` or ``None`` if unknown or evicted."""
+        return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and optionally wait for running jobs."""
+        self._executor.shutdown(wait=wait)
+
+    def _evict_finished(self):
+        # Keep at most ``history`` jobs, dropping the oldest finished ones.
+        overflow = len(self._jobs) - self.history
+        for job_id in [j for j, job in self._jobs.items() if job.finished_at][:max(overflow, 0)]:
+            self._jobs.pop(job_id)
+
+    def _run(self, job: IngestionJob, files: List[Tuple[str, Union[bytes, str]]], chunk_size: int,
+             chunk_overlap: int, hashes: Dict[str, str]):
+        job.status = RUNNING
+        try:
+            # Pinned so the namespace is not closed while the job writes to it.
+            with self.vector_stores.pinned(job.namespace, create=True) as vectorstore_mgr:
+                for filename, content in files:
+                    try:
+                        self._ingest_file(job, vectorstore_mgr, filename, content, chunk_size, chunk_overlap)
+                        if isinstance(content, str) and content in hashes:
+                            vectorstore_mgr.record_file(hashes[content], filename)
+                    except Exception as e:
+                        logger.exception("Ingestion of %s failed (job %s)", filename, job.job_id)
+                        job.failures.append({"file": filename, "error": str(e)})
+        except Exception as e:
+            logger.exception("Opening namespace %r failed (job %s)", job.namespace, job.job_id)
+            job.failures.extend({"file": filename, "error": str(e)} for filename, _ in files)
+        finally:
+            for _, content in files:
+                if isinstance(content, str) and os.path.exists(content):
+                    os.remove(content)
+            job.status = FAILED if files and len(job.failures) == len(files) else DONE
+            job.finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+            logger.info("Job %s %s: %d pages, %d chunks embedded, %d skipped",
+                        job.job_id, job.status, job.pages_processed,
+                        job.chunks_embedded, job.chunks_skipped)
+
+    def _ingest_file(self, job: IngestionJob, vectorstore_mgr: VectorStoreManager, filename: str,
+                     content: Union[bytes, str], chunk_size: int, chunk_overlap: int):
+        splitter = get_text_splitter(chunk_size, chunk_overlap)
+        pending = []
+        parse_start = time.perf_counter()
+        for page in iter_pdf_documents([(filename, content)]):
+            # Pages are parsed lazily, so parse time is the wait for each page.
+            INGEST_STAGE_SECONDS.observe(time.perf_counter() - parse_start, stage="parse")
+            INGEST_PAGES.inc()
+            job.pages_processed += 1
+            with INGEST_STAGE_SECONDS.time(stage="split"):
+                chunks = splitter.split_documents([page])
+            job.chunks_total += len(chunks)
+            pending.extend(chunks)
+            if len(pending) >= self.batch_size:
+                self._write_batch(job, vectorstore_mgr, pending)
+                pending = []
+            parse_start = time.perf_counter()
+        if pending:
+            self._write_batch(job, vectorstore_mgr, pending)
+
+    def _write_batch(self, job: IngestionJob, vectorstore_mgr: VectorStoreManager, batch):
+        added = vectorstore_mgr.add_documents(batch)
+        INGEST_BATCH_CHUNKS.observe(len(batch))
+        INGEST_CHUNKS.inc(added, outcome="embedded")
+        INGEST_CHUNKS.inc(len(batch) - added, outcome="skipped")
+        job.chunks_embedded += added
+        job.chunks_skipped += len(batch) - added
@@ -0,0 +1,270 @@
+"""Memory-mapped, quantized local vector index.
+
+A lighter alternative to Chroma for small and medium corpora. Embeddings
+are unit-normalised and stored as ``float16`` or ``int8`` (with a float32
+scale per row) in a flat file that is memory-mapped on start-up, so opening
+the index costs almost nothing and the OS pages vectors in on demand.
+Search is a NumPy-vectorised dot product over blocks of rows followed by
+``argpartition`` top-k, with optional MMR re-ranking of the candidates.
+
+On-disk layout (``path`` directory):
+  - ``vectors.bin``: quantized vectors, one row per chunk, append-only.
+  - ``scales.bin``: float32 scale per row (``int8`` only).
+  - ``rows.jsonl``: one ``{"id", "text", "metadata"}`` line per row.
+  - ``ids.txt`` and ``offsets.bin``: the id and ``rows.jsonl`` byte offset
+    (int64) of each row, so opening the index never parses ``rows.jsonl``.
+  - ``index.json``: dtype, dimension and row count, written last by an
+    append; rows past its count are an interrupted append and are dropped.
+
+Only ids and line offsets are held in memory; chunk text and metadata are
+read from ``rows.jsonl`` for the rows a search returns.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+SEARCH_BLOCK_ROWS = 65536
+DTYPES = ("float16", "int8")
+
+
+class LocalVectorIndex(VectorStore):
+    """Append-only, memory-mapped vector store with quantized embeddings."""
+
+    def __init__(self, embedding_function: Embeddings, path: str, dtype: str = "float16"):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+        self.embedding_function = embedding_function
+        self.path = path
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._offsets: List[int] = []
+        self._row_of: Dict[str, int] = {}
+        # (vectors, scales) memmaps, swapped together so readers see a
+        # consistent pair while an append remaps the files.
+        self._mapped = (None, None)
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    # ------------------------------------------------------------------ write
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [os.urandom(16).hex() for _ in texts]
+        vectors = _normalise(np.asarray(self.embedding_function.embed_documents(texts), dtype=np.float32))
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            quantized, scales = self._quantize(vectors)
+            with open(self._file("vectors.bin"), "ab") as f:
+                f.write(quantized.tobytes())
+            if scales is not None:
+                with open(self._file("scales.bin"), "ab") as f:
+                    f.write(scales.tobytes())
+            first = len(self._ids)
+            with open(self._file("rows.jsonl"), "ab") as f:
+                for doc_id, text, metadata in zip(ids, texts, metadatas):
+                    self._offsets.append(f.tell())
+                    self._row_of[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+                    f.write((json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n").encode("utf-8"))
+            self._append_row_index(first)
+            self._write_header()
+            self._map()
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, path: str = "local_index", dtype: str = "float16",
+                   **kwargs: Any) -> "LocalVectorIndex":
+        index = cls(embedding, path, dtype=dtype)
+        index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
+
+    # ------------------------------------------------------------------- read
+    def count(self) -> int:
+        return len(self._ids)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> dict:
+        """Chroma-style ``get``: ids plus the requested ``documents``/``metadatas``."""
+        include = include if include is not None else ["documents", "metadatas"]
+        rows = [self._row_of[i] for i in ids if i in self._row_of] if ids is not None else range(len(self._ids))
+        result = {"ids": [self._ids[row] for row in rows]}
+        if "documents" in include or "metadatas" in include:
+            records = [self._read_row(row) for row in rows]
+            if "documents" in include:
+                result["documents"] = [r["text"] for r in records]
+            if "metadatas" in include:
+                result["metadatas"] = [r["metadata"] for r in records]
+        return result
+
+    def get_by_ids(self, ids: List[str], /) -> List[Document]:
+        return [self._document(self._row_of[i]) for i in ids if i in self._row_of]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        rows, scores = self._top_k(self.embedding_function.embed_query(query), k)
+        return [(self._document(row), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        rows, _ = self._top_k(embedding, k)
+        return [self._document(row) for row in rows]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding_function.embed_query(query), k, fetch_k, lambda_mult)
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        rows, _ = self._top_k(embedding, fetch_k)
+        if not len(rows):
+            return []
+        candidates = self._dequantize(rows)
+        picked = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32), candidates, lambda_mult=lambda_mult, k=k)
+        return [self._document(rows[i]) for i in picked]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]; map them to [0, 1].
+        # Quantization error can push a perfect match slightly past 1.
+        return lambda score: min(1.0, max(0.0, (score + 1) / 2))
+
+    # -------------------------------------------------------------- internals
+    def _top_k(self, embedding: List[float], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        vectors, scales = self._mapped
+        if vectors is None or not k:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = _normalise(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+
+        best_rows, best_scores = [], []
+        for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores = block @ query
+            if scales is not None:
+                scores *= scales[start:start + SEARCH_BLOCK_ROWS]
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            best_rows.append(top + start)
+            best_scores.append(scores[top])
+
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(-scores)[:k]
+        return rows[order], scores[order]
+
+    def _quantize(self, vectors: np.ndarray):
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        vectors, scales = self._mapped
+        vectors = np.asarray(vectors[rows], dtype=np.float32)
+        if scales is not None:
+            vectors *= scales[rows][:, None]
+        return vectors
+
+    def _read_row(self, row: int) -> dict:
+        with open(self._file("rows.jsonl"), "rb") as f:
+            f.seek(self._offsets[row])
+            return json.loads(f.readline())
+
+    def _document(self, row: int) -> Document:
+        record = self._read_row(int(row))
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _append_row_index(self, first: int):
+        with open(self._file("ids.txt"), "ab") as f:
+            f.write("".join(i + "\n" for i in self._ids[first:]).encode("utf-8"))
+        with open(self._file("offsets.bin"), "ab") as f:
+            f.write(np.asarray(self._offsets[first:], dtype=np.int64).tobytes())
+
+    def _write_header(self):
+        tmp_path = self._file("index.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "dim": self.dim, "count": len(self._ids)}, f)
+        os.replace(tmp_path, self._file("index.json"))
+
+    def _map(self):
+        count = len(self._ids)
+        if not count:
+            return
+        vectors = np.memmap(self._file("vectors.bin"), dtype=self.dtype, mode="r", shape=(count, self.dim))
+        scales = None
+        if self.dtype == "int8":
+            scales = np.memmap(self._file("scales.bin"), dtype=np.float32, mode="r", shape=(count,))
+        self._mapped = (vectors, scales)
+
+    def _load(self):
+        if not os.path.exists(self._file("index.json")):
+            return
+        with open(self._file("index.json"), encoding="utf-8") as f:
+            header = json.load(f)
+        if header["dtype"] != self.dtype:
+            raise ValueError(f"Index at {self.path} stores {header['dtype']}, not {self.dtype}")
+        self.dim = header["dim"]
+
+        count = header["count"]
+        missing = [name for name in ("ids.txt", "offsets.bin") if not os.path.exists(self._file(name))]
+        if missing:
+            raise ValueError(f"Index at {self.path} has no {' or '.join(missing)}; "
+                             "delete the directory and re-ingest the documents to rebuild it")
+        self._offsets = np.fromfile(self._file("offsets.bin"), dtype=np.int64, count=count).tolist()
+        with open(self._file("ids.txt"), "rb") as f:
+            self._ids = [f.readline().decode("utf-8").rstrip("\n") for _ in range(count)]
+            ids_end = f.tell()
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+
+        rows_end = 0
+        if count:
+            with open(self._file("rows.jsonl"), "rb") as f:
+                f.seek(self._offsets[-1])
+                f.readline()
+                rows_end = f.tell()
+
+        # Data past the header count belongs to an interrupted append; drop it
+        # so the next append lines up with the header again.
+        _truncate(self._file("rows.jsonl"), rows_end)
+        _truncate(self._file("ids.txt"), ids_end)
+        _truncate(self._file("offsets.bin"), count * np.dtype(np.int64).itemsize)
+        _truncate(self._file("vectors.bin"), count * (self.dim or 0) * np.dtype(self.dtype).itemsize)
+        if self.dtype == "int8":
+            _truncate(self._file("scales.bin"), count * np.dtype(np.float32).itemsize)
+        self._map()
+
+
+def _truncate(path: str, size: int):
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
@@ -0,0 +1,198 @@
+"""Namespaced vector stores.
+
+Uploads used to go into a single collection, so every ``/chat`` searched
+every PDF anyone had uploaded. A namespace (workspace or document set) now
+gets its own partition: a Chroma collection or local index, BM25 index and
+stats counters, so a query only scans the chunks of its own namespace.
+  - ``NamespaceStores.get`` opens a namespace's ``VectorStoreManager`` on
+      first use; all of them share one embedding model.
+  - Namespaces idle for ``NAMESPACE_IDLE_SECONDS``, or the least recently
+      used ones beyond ``NAMESPACE_MAX_OPEN``, are evicted from memory and
+      reopened from disk when needed again; the app checks for idle ones
+      periodically (``evict_idle``). Namespaces pinned by a running
+      ingestion job are never evicted.
+  - ``list`` and ``drop`` back the ``/namespaces`` API.
+
+The default namespace (``DEFAULT_NAMESPACE``) is the store that predates
+namespaces; requests without a namespace use it.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import settings
+from services.vectorstore import VectorStoreManager, build_embeddings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Also a valid Chroma collection name once prefixed with "ns-".
+_NAME_RE = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,58}[A-Za-z0-9])?$")
+
+
+class UnknownNamespaceError(KeyError):
+    """Raised when a namespace that has never been created is requested."""
+
+
+def validate_namespace(namespace: str) -> str:
+    """Return ``namespace`` if it is a valid name, else raise ``ValueError``."""
+    if not _NAME_RE.match(namespace):
+        raise ValueError(
+            f"Invalid namespace {namespace!r}: use 1-60 letters, digits, '-' or '_', "
+            "starting and ending with a letter or digit")
+    return namespace
+
+
+class NamespaceStores:
+    """Lazily opened, evictable ``VectorStoreManager`` per namespace."""
+
+    def __init__(self, embedding_model: Optional[str] = None, max_open: Optional[int] = None,
+                 idle_seconds: Optional[float] = None):
+        self.embedding_model = embedding_model or settings.EMBEDDING_MODEL
+        self.max_open = max_open or settings.NAMESPACE_MAX_OPEN
+        self.idle_seconds = idle_seconds if idle_seconds is not None else settings.NAMESPACE_IDLE_SECONDS
+        self.default_namespace = settings.DEFAULT_NAMESPACE
+        self.root_dir = os.path.join(settings.PROJECT_ROOT, "persist_dir")
+        self.embeddings = build_embeddings(self.embedding_model)
+        # namespace -> manager, least recently used first
+        self._open: "OrderedDict[str, VectorStoreManager]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._pins: Dict[str, int] = {}
+        self._change_listeners: List[Callable[[str], None]] = []
+        self._evict_listeners: List[Callable[[str], None]] = []
+        self._lock = threading.RLock()
+
+    def get(self, namespace: Optional[str] = None, create: bool = False) -> VectorStoreManager:
+        """Return the manager of ``namespace`` (default namespace if ``None``).
+
+        Raises:
+            ValueError: if the name is invalid.
+            UnknownNamespaceError: if the namespace does not exist and
+                ``create`` is false.
+        """
+        namespace = self._resolve(namespace)
+        with self._lock:
+            mgr = self._open.get(namespace)
+            if mgr is None:
+                if not create and not self.exists(namespace):
+                    raise UnknownNamespaceError(namespace)
+                mgr = VectorStoreManager(self.embedding_model, namespace=namespace, embeddings=self.embeddings)
+                os.makedirs(mgr.persist_dir, exist_ok=True)
+                for callback in self._change_listeners:
+                    mgr.add_change_listener(callback)
+                self._open[namespace] = mgr
+            self._open.move_to_end(namespace)
+            self._last_used[namespace] = time.monotonic()
+            self._evict()
+        return mgr
+
+    @contextmanager
+    def pinned(self, namespace: Optional[str] = None, create: bool = False) -> Iterator[VectorStoreManager]:
+        """``get`` a namespace and keep it open for the duration of the block."""
+        namespace = self._resolve(namespace)
+        with self._lock:
+            mgr = self.get(namespace, create=create)
+            self._pins[namespace] = self._pins.get(namespace, 0) + 1
+        try:
+            yield mgr
+        finally:
+            with self._lock:
+                self._pins[namespace] -= 1
+                if not self._pins[namespace]:
+                    del self._pins[namespace]
+                self._last_used[namespace] = time.monotonic()
+
+    def exists(self, namespace: str) -> bool:
+        """Return whether ``namespace`` is open or has data on disk."""
+        if namespace == self.default_namespace or namespace in self._open:
+            return True
+        return os.path.isdir(os.path.join(self.root_dir, "namespaces", namespace))
+
+    def list(self) -> List[dict]:
+        """Return every namespace with its chunk count and whether it is open."""
+        with self._lock:
+            names = {self.default_namespace, *self._open}
+            namespaces_dir = os.path.join(self.root_dir, "namespaces")
+            if os.path.isdir(namespaces_dir):
+                names.update(name for name in os.listdir(namespaces_dir)
+                             if os.path.isdir(os.path.join(namespaces_dir, name)))
+            result = []
+            for name in sorted(names):
+                mgr = self._open.get(name)
+                result.append({
+                    "namespace": name,
+                    "loaded": mgr is not None,
+                    "chunks": mgr.count() if mgr is not None else self._stored_chunks(name),
+                })
+        return result
+
+    def drop(self, namespace: str):
+        """Delete ``namespace`` and everything indexed in it.
+
+        Raises:
+            UnknownNamespaceError: if the namespace does not exist.
+            RuntimeError: if an ingestion job is still writing to it.
+        """
+        namespace = self._resolve(namespace)
+        with self._lock:
+            if self._pins.get(namespace):
+                raise RuntimeError(f"Namespace {namespace!r} is being ingested into, retry later")
+            mgr = self.get(namespace)
+            self._forget(namespace)
+            mgr.drop()
+
+    def evict_idle(self):
+        """Close namespaces unused for longer than ``idle_seconds``."""
+        with self._lock:
+            self._evict()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed ``text`` with the shared embedding model."""
+        return self.embeddings.embed_query(text)
+
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Call ``callback(namespace)`` whenever a namespace gains chunks or is dropped."""
+        with self._lock:
+            self._change_listeners.append(callback)
+            for mgr in self._open.values():
+                mgr.add_change_listener(callback)
+
+    def add_evict_listener(self, callback: Callable[[str], None]):
+        """Call ``callback(namespace)`` when a namespace is closed or dropped."""
+        self._evict_listeners.append(callback)
+
+    def _resolve(self, namespace: Optional[str]) -> str:
+        return validate_namespace(namespace) if namespace else self.default_namespace
+
+    def _evict(self):
+        now = time.monotonic()
+        for namespace in list(self._open):
+            if namespace in self._pins:
+                continue
+            idle = now - self._last_used.get(namespace, now) > self.idle_seconds
+            if idle or len(self._open) > self.max_open:
+                logger.info("Closing %s namespace %r", "idle" if idle else "least recently used", namespace)
+                self._forget(namespace)
+
+    def _forget(self, namespace: str):
+        self._open.pop(namespace, None)
+        self._last_used.pop(namespace, None)
+        for callback in self._evict_listeners:
+            callback(namespace)
+
+    def _stored_chunks(self, namespace: str) -> Optional[int]:
+        # Closed namespaces report the counters persisted in stats.json.
+        path = os.path.join(self.root_dir, "namespaces", namespace, "stats.json")
+        if namespace == self.default_namespace:
+            path = os.path.join(self.root_dir, "stats.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return sum(json.load(f)["sources"].values())
+        except (OSError, ValueError, KeyError):
+            return None
@@ -1,4 +1,4 @@
-"""RAG chain builder and in-memory session history manager.
+"""RAG chain builder.
 
 This module provides a single high-level function, ``build_chain``, which
 creates and returns a history-aware retrieval-augmented generation (RAG)
@@ -8,42 +8,84 @@ pipeline wrapped as a ``RunnableWithMessageHistory``.
   - Create a history-aware retriever that uses the provided vectorstore
       manager to fetch context relevant to the (rewritten) question.
   - Compose a concise QA chain that answers only from retrieved context.
-  - Trim the chat history to remain under the model's token limits before
-      each request.
+  - Optionally consult a ``SemanticAnswerCache`` between retrieval and the
+      answer LLM call.
+  - Optionally compress the retrieved context to the sentences that best
+      match the question (``services.context_compression``) before it is
+      stuffed into the answer prompt.
+  - Keep the chat history under the model's token limits. Sessions track
+      per-message token counts as messages are appended (see
+      ``services.session_store``) and only hand the newest messages that fit
+      ``HISTORY_MAX_TOKENS`` to the chain, so nothing is re-tokenised per turn.
+
+Building the chain is not free (prompts, retriever wrappers and a fresh LLM
+client with its own HTTP connection pool), so routes should obtain it from a
+``ChainRegistry`` which builds it once per namespace and configuration and
+shares a single pooled LLM client per model.
 """
-from typing import Any, Dict
+import threading
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from langchain_groq import ChatGroq
-from langchain.chains import create_retrieval_chain, create_history_aware_retriever
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableBranch, RunnableLambda, RunnablePassthrough
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.messages import trim_messages
-from langchain_core.runnables import RunnableLambda
-from langchain_community.chat_message_histories import ChatMessageHistory
 
 from config import settings
-from services.vectorstore import VectorStoreManager
-
+from services.answer_cache import SemanticAnswerCache
+from services.context_compression import ContextCompressor, build_compressor
+from services.session_store import SessionStore, get_session_store
+from services.vectorstore import VectorStoreManager, default_search_kwargs
 
 
-# In-memory chat histories keyed by session_id
-CHAT_HISTORIES = {}
+# Shared LLM clients keyed by model name. ChatGroq keeps an HTTP connection
+# pool on the instance, so reusing it keeps connections alive across requests.
+_LLM_CLIENTS: Dict[str, Any] = {}
+_LLM_LOCK = threading.Lock()
 
 
-def _get_session_history(session_id: str):
-    if session_id not in CHAT_HISTORIES:
-        CHAT_HISTORIES[session_id] = ChatMessageHistory()
+def get_llm(model_name: Optional[str] = None):
+    """Return the shared ChatGroq client for ``model_name``.
 
-    return CHAT_HISTORIES[session_id]
+    Falls back to ``settings.LLM_MODEL``. The client is created on first use.
+    """
+    model_name = model_name or settings.LLM_MODEL
+    llm = _LLM_CLIENTS.get(model_name)
+    if llm is None:
+        with _LLM_LOCK:
+            llm = _LLM_CLIENTS.get(model_name)
+            if llm is None:
+                llm = ChatGroq(groq_api_key=settings.GROQ_API_KEY, model_name=model_name)
+                _LLM_CLIENTS[model_name] = llm
+    return llm
 
 
-def build_chain(vectorstore_mgr: VectorStoreManager):
+def build_chain(vectorstore_mgr: VectorStoreManager, llm=None, search_kwargs: Optional[dict] = None,
+                session_store: Optional[SessionStore] = None,
+                answer_cache: Optional[SemanticAnswerCache] = None,
+                retriever_mode: Optional[str] = None,
+                context_compressor: Optional[ContextCompressor] = None):
     """
-    Create a retrieval + QA chain with history-aware retriever and a trimmer.
+    Create a retrieval + QA chain with history-aware retriever.
     Returns a RunnableWithMessageHistory ready for .invoke(...)
+
+    ``llm`` defaults to the shared client from ``get_llm``,
+    ``search_kwargs`` and ``retriever_mode`` are forwarded to
+    ``vectorstore_mgr.as_retriever`` and
+    ``session_store`` defaults to the store from ``get_session_store``.
+    When ``answer_cache`` is given, answers are looked up in it after
+    retrieval and stored in it after generation.
+    When ``context_compressor`` is given, the answer prompt only gets the
+    sentences it keeps; the output ``context`` still holds the full chunks.
+
+    The chain output holds ``input``, ``chat_history``, the rewritten
+    ``standalone_question``, the retrieved ``context`` and the ``answer``.
     """
-    llm = ChatGroq(groq_api_key=settings.GROQ_API_KEY, model_name=settings.LLM_MODEL)
+    llm = llm or get_llm()
+    session_store = session_store or get_session_store()
 
     # History-aware contextualizer
     contextualize_q_system_prompt = (
@@ -61,8 +103,18 @@ def build_chain(vectorstore_mgr: VectorStoreManager):
         ]
     )
 
-    retriever = vectorstore_mgr.as_retriever()
-    history_aware_retriever = create_history_aware_retriever(llm, retriever, contextualize_q_prompt)
+    # Same behaviour as ``create_history_aware_retriever``, but the rewritten
+    # question is kept in the output so the answer cache can key on it.
+    rewrite_question = RunnableBranch(
+        (lambda x: not x.get("chat_history"), itemgetter("input")),
+        contextualize_q_prompt | llm | StrOutputParser(),
+    ).with_config(run_name="rewrite_question")
+
+    retriever = vectorstore_mgr.as_retriever(search_kwargs, mode=retriever_mode)
+    retrieval = (
+        RunnablePassthrough.assign(standalone_question=rewrite_question)
+        .assign(context=(itemgetter("standalone_question") | retriever).with_config(run_name="retrieve_documents"))
+    )
 
     # QA prompt expects {context}
     system_prompt = (
@@ -82,30 +134,130 @@ def build_chain(vectorstore_mgr: VectorStoreManager):
     )
 
     question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
-    rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
-
-    # Trimmer runnable to keep messages under token limit
-    trimmer = RunnableLambda(
-        lambda x: {
-            **x,
-            "chat_history": trim_messages(
-                x.get("chat_history", []),
-                token_counter=llm,
-                max_tokens=4000,
-                strategy="last"
-            ),
-        }
-    )
-
-    chain = trimmer | rag_chain
+    if context_compressor is not None:
+        compress = RunnableLambda(context_compressor).with_config(run_name="compress_context")
+        question_answer_chain = RunnablePassthrough.assign(context=compress) | question_answer_chain
+    if answer_cache is None:
+        rag_chain = retrieval.assign(answer=question_answer_chain)
+    else:
+        rag_chain = answer_cache.wrap(retrieval, question_answer_chain, vectorstore_mgr.namespace)
 
-    # Wrap with message history accessor
+    # Wrap with message history accessor. The session histories already
+    # return only the token-budgeted window, so no trimmer is needed here.
     runnable_with_history = RunnableWithMessageHistory(
-        chain,
-        _get_session_history,
+        rag_chain,
+        session_store.get,
         input_message_key="input",
         history_messages_key="chat_history",
         output_messages_key="answer",
     )
 
-    return runnable_with_history
\ No newline at end of file
+    return runnable_with_history
+
+
+async def astream_answer(chain, question: str, session_id: str,
+                         callbacks: Optional[List[Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream a chain answer as ``(event, data)`` pairs.
+
+    Yields a single ``("context", List[Document])`` pair as soon as retrieval
+    finishes, followed by ``("token", str)`` pairs as the answer LLM produces
+    them. History is still recorded by ``RunnableWithMessageHistory`` once the
+    stream completes. ``callbacks`` (e.g. a ``ChainTimer``) are attached to
+    the run.
+    """
+    async for chunk in chain.astream(
+        {"input": question},
+        config={"configurable": {"session_id": session_id}, "callbacks": callbacks or []},
+    ):
+        if "context" in chunk:
+            yield "context", chunk["context"]
+        if chunk.get("answer"):
+            yield "token", chunk["answer"]
+
+
+ChainKey = Tuple[str, str, str, Tuple[Tuple[str, Any], ...]]
+
+
+class ChainRegistry:
+    """Build-once cache of RAG chains keyed by namespace, model and retriever settings.
+
+    ``get`` returns the chain of a namespace for the current settings,
+    building it on first use. Lookups are lock-free: the mapping is replaced
+    as a whole under a lock, so readers always see either the old or the new
+    set of chains. When the settings change, the chain for the new key is
+    built and swapped in while in-flight requests keep using the one they
+    already hold. Chains of namespaces closed by ``vector_stores`` are
+    dropped with them.
+
+    ``vector_stores`` is a ``services.namespaces.NamespaceStores`` (or any
+    object with the same ``get``/``add_evict_listener`` methods).
+    ``retriever_mode`` pins the retriever mode; by default it follows
+    ``settings.RETRIEVER_MODE``.
+    """
+
+    def __init__(self, vector_stores, llm_factory=get_llm,
+                 answer_cache: Optional[SemanticAnswerCache] = None,
+                 retriever_mode: Optional[str] = None):
+        self.vector_stores = vector_stores
+        self.llm_factory = llm_factory
+        self.answer_cache = answer_cache
+        self.retriever_mode = retriever_mode
+        self._chains: Dict[ChainKey, Tuple[VectorStoreManager, Any]] = {}
+        self._lock = threading.Lock()
+        vector_stores.add_evict_listener(self.invalidate)
+
+    def make_key(self, model_name: Optional[str] = None, search_kwargs: Optional[dict] = None,
+                 namespace: Optional[str] = None) -> ChainKey:
+        """Return the registry key for a namespace, model name, retriever mode and kwargs."""
+        namespace = namespace or settings.DEFAULT_NAMESPACE
+        model_name = model_name or settings.LLM_MODEL
+        search_kwargs = search_kwargs or default_search_kwargs()
+        retriever_mode = self.retriever_mode or settings.RETRIEVER_MODE
+        return namespace, model_name, retriever_mode, tuple(sorted(search_kwargs.items()))
+
+    def get(self, model_name: Optional[str] = None, search_kwargs: Optional[dict] = None,
+            namespace: Optional[str] = None):
+        """Return the chain for the given (or configured) settings and namespace.
+
+        Raises whatever ``vector_stores.get`` raises for an unknown or
+        invalid namespace.
+        """
+        key = self.make_key(model_name, search_kwargs, namespace)
+        vectorstore_mgr = self.vector_stores.get(key[0])
+        entry = self._chains.get(key)
+        if entry is not None and entry[0] is vectorstore_mgr:
+            return entry[1]
+
+        with self._lock:
+            entry = self._chains.get(key)
+            if entry is None or entry[0] is not vectorstore_mgr:
+                entry = (vectorstore_mgr, self._build(vectorstore_mgr, key))
+                # Only the current configuration of each namespace is kept;
+                # older chains are dropped once in-flight requests release them.
+                chains = {k: v for k, v in self._chains.items() if k[0] != key[0]}
+                chains[key] = entry
+                self._chains = chains
+        return entry[1]
+
+    def warm_up(self):
+        """Build the default namespace's chain for the configured settings ahead of first use."""
+        return self.get()
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop the cached chains of ``namespace`` (all if ``None``) so the next ``get`` rebuilds them."""
+        with self._lock:
+            if namespace is None:
+                self._chains = {}
+            else:
+                self._chains = {k: v for k, v in self._chains.items() if k[0] != namespace}
+
+    def _build(self, vectorstore_mgr: VectorStoreManager, key: ChainKey):
+        _, model_name, mode, search_items = key
+        return build_chain(
+            vectorstore_mgr,
+            llm=self.llm_factory(model_name),
+            search_kwargs=dict(search_items),
+            retriever_mode=mode,
+            answer_cache=self.answer_cache,
+            context_compressor=build_compressor(vectorstore_mgr),
+        )
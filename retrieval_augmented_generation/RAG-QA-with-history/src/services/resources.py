@@ -0,0 +1,89 @@
+"""Process-wide RAG resources and their start-up lifecycle.
+
+The embedding model, vector store, chain registry, ingestion queue and
+upload spool are expensive to create, so they are no longer built when
+``api.routes.rag`` is imported. ``main.py``'s lifespan handler calls ``load_resources`` and
+``warm_up`` in the background after the app has started and stores the
+result on ``app.state.resources``; routes get it through
+``api.routes.rag.get_resources``, which answers 503 until it is ready.
+  - ``load_resources``: import the heavy modules and build the resources.
+  - ``warm_up``: pay first-call costs (model forward pass, index pages,
+      retriever and chain construction, chunking tokenizer, session store)
+      before traffic.
+  - ``RAGResources.close``: stop the ingestion workers on shutdown.
+
+Heavy modules (LangChain integrations, sentence-transformers, Chroma,
+PyMuPDF) are imported inside ``load_resources`` so importing the app stays
+cheap, which keeps ``--reload`` restarts and tooling fast.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from services.answer_cache import SemanticAnswerCache
+    from services.ingestion import IngestionQueue
+    from services.namespaces import NamespaceStores
+    from services.rag_chain import ChainRegistry
+    from services.uploads import UploadSpool
+
+logger = get_logger(__name__)
+
+WARM_UP_QUERY = "warm up"
+
+
+@dataclass
+class RAGResources:
+    """Heavy objects shared by the RAG routes."""
+
+    vector_stores: "NamespaceStores"
+    chain_registry: "ChainRegistry"
+    ingestion_queue: "IngestionQueue"
+    uploads: "UploadSpool"
+    answer_cache: Optional["SemanticAnswerCache"] = None
+
+    def close(self):
+        """Stop accepting uploads and wait for running ingestion jobs."""
+        self.ingestion_queue.shutdown(wait=True)
+
+
+def load_resources() -> RAGResources:
+    """Build the namespaced vector stores, answer cache, chain registry, ingestion queue and upload spool."""
+    from config import settings
+    from services.answer_cache import SemanticAnswerCache
+    from services.ingestion import IngestionQueue
+    from services.namespaces import NamespaceStores
+    from services.rag_chain import ChainRegistry
+    from services.uploads import UploadSpool
+
+    start = time.perf_counter()
+    vector_stores = NamespaceStores()
+    answer_cache = SemanticAnswerCache(vector_stores) if settings.ANSWER_CACHE_ENABLED else None
+    resources = RAGResources(
+        vector_stores=vector_stores,
+        chain_registry=ChainRegistry(vector_stores, answer_cache=answer_cache),
+        ingestion_queue=IngestionQueue(vector_stores),
+        uploads=UploadSpool(),
+        answer_cache=answer_cache,
+    )
+    logger.info("Loaded RAG resources in %.2fs", time.perf_counter() - start)
+    return resources
+
+
+def warm_up(resources: RAGResources):
+    """Run a dummy embedding and retrieval and build the chain ahead of traffic."""
+    from services.session_store import get_session_store
+    from services.text_splitter import get_text_splitter
+
+    start = time.perf_counter()
+    vectorstore_mgr = resources.vector_stores.get()
+    vectorstore_mgr.embed_query(WARM_UP_QUERY)
+    if vectorstore_mgr.count():
+        vectorstore_mgr.as_retriever().invoke(WARM_UP_QUERY)
+    resources.chain_registry.warm_up()
+    get_text_splitter()
+    get_session_store()
+    logger.info("Warmed up RAG resources in %.2fs", time.perf_counter() - start)
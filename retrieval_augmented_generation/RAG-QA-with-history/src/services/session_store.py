@@ -0,0 +1,377 @@
+"""Bounded chat-session storage for the RAG chain.
+
+Chat histories used to live in a module-level dict that grew forever. This
+module replaces it with a ``SessionStore`` that caps:
+  - the number of sessions held (least-recently-used sessions are evicted),
+  - how long an idle session is kept (idle TTL),
+  - how many messages a single session keeps (oldest messages are dropped).
+
+Each message's token count is computed once, when it is appended, with the
+local counter from ``services.token_counter``. Histories keep a running sum
+over the newest messages that fit in ``max_tokens``, so ``messages`` returns
+the trimmed window the chain should see at O(new messages) cost per turn,
+instead of re-tokenising the whole history on every request.
+
+Two backends are provided:
+  - ``InMemorySessionStore``: the default, per-process store.
+  - ``SQLiteSessionStore``: persists sessions to a SQLite file so they
+      survive restarts and can be shared by several uvicorn workers.
+
+Use ``get_session_store`` to obtain the store configured in settings.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+from config import settings
+from services.token_counter import TokenCounter, count_message_tokens, get_token_counter
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    """In-memory chat history that keeps at most ``max_messages`` messages.
+
+    ``messages`` returns only the newest messages whose summed token counts
+    fit in ``max_tokens``; ``all_messages`` returns everything retained.
+    """
+
+    def __init__(self, max_messages: int, max_tokens: int, token_counter: TokenCounter):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self._messages = deque()
+        self._tokens = deque()
+        # The window is the newest ``_window_len`` messages.
+        self._window_len = 0
+        self._window_tokens = 0
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        start = len(self._messages) - self._window_len
+        return list(islice(self._messages, start, None))
+
+    @property
+    def all_messages(self) -> List[BaseMessage]:
+        return list(self._messages)
+
+    @property
+    def window_tokens(self) -> int:
+        return self._window_tokens
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        for message in messages:
+            tokens = count_message_tokens(message, self.token_counter)
+            self._messages.append(message)
+            self._tokens.append(tokens)
+            self._window_len += 1
+            self._window_tokens += tokens
+
+            while self._window_tokens > self.max_tokens and self._window_len:
+                self._window_tokens -= self._tokens[-self._window_len]
+                self._window_len -= 1
+
+            if len(self._messages) > self.max_messages:
+                self._messages.popleft()
+                dropped = self._tokens.popleft()
+                if self._window_len > len(self._messages):
+                    self._window_tokens -= dropped
+                    self._window_len -= 1
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._tokens.clear()
+        self._window_len = 0
+        self._window_tokens = 0
+
+
+class SessionStore(ABC):
+    """Interface shared by the session store backends."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        """Return the history for ``session_id``, creating it if needed."""
+
+    @abstractmethod
+    def reset(self, session_id: str) -> bool:
+        """Drop ``session_id``; return whether it existed."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Return the number of sessions held."""
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process LRU store of ``BoundedChatMessageHistory`` objects."""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, max_messages: int,
+                 max_tokens: int, token_counter: TokenCounter):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        # session_id -> (history, last_access); ordered by last access
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.pop(session_id, None)
+            history = entry[0] if entry else BoundedChatMessageHistory(
+                self.max_messages, self.max_tokens, self.token_counter)
+            self._sessions[session_id] = (history, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return history
+
+    def reset(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_expired(self, now: float):
+        # Entries are ordered by last access, so expired ones are at the front.
+        while self._sessions:
+            _, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """Chat history for one session stored in a ``SQLiteSessionStore``.
+
+    The token window is tracked on the session row (``window_start`` is the
+    id of its oldest message, ``window_tokens`` its running sum), so reads
+    only fetch the window and writes only touch the new and dropped rows.
+    """
+
+    def __init__(self, store: "SQLiteSessionStore", session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        rows = self.store._query(
+            "SELECT m.message FROM messages m JOIN sessions s ON s.session_id = m.session_id "
+            "WHERE m.session_id = ? AND m.id >= s.window_start ORDER BY m.id",
+            (self.session_id,),
+        )
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        counter = self.store.token_counter
+        rows = [
+            (json.dumps(data), count_message_tokens(message, counter))
+            for message, data in zip(messages, messages_to_dict(messages))
+        ]
+        conn = self.store._conn
+        with self.store._lock, conn:
+            # Re-create the session row in case it was evicted meanwhile.
+            conn.execute(
+                "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                (self.session_id, time.time()),
+            )
+            window_start, window_tokens = conn.execute(
+                "SELECT window_start, window_tokens FROM sessions WHERE session_id = ?",
+                (self.session_id,),
+            ).fetchone()
+
+            for message, tokens in rows:
+                conn.execute(
+                    "INSERT INTO messages (session_id, message, tokens) VALUES (?, ?, ?)",
+                    (self.session_id, message, tokens),
+                )
+                window_tokens += tokens
+
+            # Slide the window start forward past the oldest messages until
+            # the running sum fits the budget again.
+            while window_tokens > self.store.max_tokens:
+                row = conn.execute(
+                    "SELECT id, tokens FROM messages WHERE session_id = ? AND id >= ? "
+                    "ORDER BY id LIMIT 1",
+                    (self.session_id, window_start),
+                ).fetchone()
+                if row is None:
+                    break
+                window_start, window_tokens = row[0] + 1, window_tokens - row[1]
+
+            conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (self.session_id, self.session_id, self.store.max_messages),
+            )
+            oldest = conn.execute(
+                "SELECT MIN(id) FROM messages WHERE session_id = ?", (self.session_id,)
+            ).fetchone()[0]
+            if oldest is not None and oldest > window_start:
+                # The message cap cut into the window; recount what is left.
+                window_start = oldest
+                window_tokens = conn.execute(
+                    "SELECT COALESCE(SUM(tokens), 0) FROM messages WHERE session_id = ? AND id >= ?",
+                    (self.session_id, window_start),
+                ).fetchone()[0]
+
+            conn.execute(
+                "UPDATE sessions SET window_start = ?, window_tokens = ? WHERE session_id = ?",
+                (window_start, window_tokens, self.session_id),
+            )
+
+    def clear(self) -> None:
+        with self.store._lock, self.store._conn:
+            self.store._conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            self.store._conn.execute(
+                "UPDATE sessions SET window_start = 0, window_tokens = 0 WHERE session_id = ?",
+                (self.session_id,),
+            )
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store persisted in a SQLite database file.
+
+    The database runs in WAL mode so several worker processes can read and
+    write it concurrently. Expired and surplus sessions are pruned whenever
+    a session is opened.
+    """
+
+    def __init__(self, path: str, max_sessions: int, ttl_seconds: float, max_messages: int,
+                 max_tokens: int, token_counter: TokenCounter):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, last_access REAL NOT NULL, "
+                "window_start INTEGER NOT NULL DEFAULT 0, "
+                "window_tokens INTEGER NOT NULL DEFAULT 0)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE, "
+                "message TEXT NOT NULL, tokens INTEGER NOT NULL)")
+            self._migrate()
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+        logger.info("Using SQLite session store at %s", path)
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                (session_id, now),
+            )
+            self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id NOT IN "
+                "(SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT ?)",
+                (self.max_sessions,),
+            )
+        return SQLiteChatMessageHistory(self, session_id)
+
+    def reset(self, session_id: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM sessions")[0][0]
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _migrate(self):
+        """Add the token-window columns to a database created without them.
+
+        Stored messages are counted once and each session's window is
+        rebuilt from the newest messages that fit in ``max_tokens``.
+        """
+        session_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        message_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if {"window_start", "window_tokens"} <= session_columns and "tokens" in message_columns:
+            return
+
+        for column in ("window_start", "window_tokens"):
+            if column not in session_columns:
+                self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+        if "tokens" not in message_columns:
+            self._conn.execute("ALTER TABLE messages ADD COLUMN tokens INTEGER NOT NULL DEFAULT 0")
+            rows = self._conn.execute("SELECT id, message FROM messages").fetchall()
+            self._conn.executemany(
+                "UPDATE messages SET tokens = ? WHERE id = ?",
+                [(count_message_tokens(messages_from_dict([json.loads(message)])[0], self.token_counter), row_id)
+                 for row_id, message in rows],
+            )
+
+        for (session_id,) in self._conn.execute("SELECT session_id FROM sessions").fetchall():
+            rows = self._conn.execute(
+                "SELECT id, tokens FROM messages WHERE session_id = ? ORDER BY id DESC", (session_id,)
+            ).fetchall()
+            window_start = rows[0][0] + 1 if rows else 0
+            window_tokens = 0
+            for row_id, tokens in rows:
+                if window_tokens + tokens > self.max_tokens:
+                    break
+                window_start, window_tokens = row_id, window_tokens + tokens
+            self._conn.execute(
+                "UPDATE sessions SET window_start = ?, window_tokens = ? WHERE session_id = ?",
+                (window_start, window_tokens, session_id),
+            )
+        logger.info("Migrated session store %s to token windows", self.path)
+
+
+_STORE: Optional[SessionStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store configured in settings."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                limits = dict(
+                    max_sessions=settings.SESSION_MAX_SESSIONS,
+                    ttl_seconds=settings.SESSION_TTL_SECONDS,
+                    max_messages=settings.SESSION_MAX_MESSAGES,
+                    max_tokens=settings.HISTORY_MAX_TOKENS,
+                    token_counter=get_token_counter(),
+                )
+                if settings.SESSION_BACKEND == "sqlite":
+                    path = settings.SESSION_DB_PATH or os.path.join(
+                        settings.PROJECT_ROOT, "runtime", "sessions.sqlite3")
+                    _STORE = SQLiteSessionStore(path, **limits)
+                else:
+                    _STORE = InMemorySessionStore(**limits)
+    return _STORE
@@ -1,14 +1,111 @@
 # backend/services/text_splitter.py
+"""Token-aware, reusable text splitting for ingestion.
+
+Chunks used to be sized in characters (2000/100 hardcoded in ``/upload``),
+which does not line up with the embedding model's token limit, and a new
+splitter was built for every call.
+  - Chunk size and overlap are counted in tokens of the embedding model's
+      tokenizer (``CHUNK_TOKENIZER``, defaulting to ``EMBEDDING_MODEL``;
+      ``"approx"`` counts about four characters per token). Sizes above the
+      tokenizer's ``model_max_length`` are clamped so nothing is truncated
+      at embedding time.
+  - Defaults come from ``CHUNK_SIZE``/``CHUNK_OVERLAP``; uploads may
+      override them per request.
+  - Splitters are cached per (size, overlap) and the tokenizer is loaded
+      once per process.
+  - ``iter_split_documents`` consumes and yields documents lazily.
+"""
+
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
-def get_text_splitter(chunk_size: int = 500, chunk_overlap:int = 50):
-    """Return a text splitter configured from config."""
-    return RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-    )
+from config import settings
+from services.token_counter import HuggingFaceTokenCounter, TokenCounter, approximate_token_count
+from utils.logger import get_logger
 
-def split_documents(docs, chunk_size:int, chunk_overlap:int):
-    """Split documents into chunks."""
+logger = get_logger(__name__)
+
+# Room for the [CLS]/[SEP]-style tokens the embedding model adds.
+SPECIAL_TOKENS_MARGIN = 2
+
+_COUNTER: Optional[Tuple[TokenCounter, Optional[int]]] = None
+_SPLITTERS: Dict[Tuple[int, int], RecursiveCharacterTextSplitter] = {}
+_LOCK = threading.Lock()
+
+
+def _get_counter() -> Tuple[TokenCounter, Optional[int]]:
+    """Return the chunk token counter and the tokenizer's max length (if known)."""
+    global _COUNTER
+    if _COUNTER is None:
+        with _LOCK:
+            if _COUNTER is None:
+                name = settings.CHUNK_TOKENIZER or settings.EMBEDDING_MODEL
+                if name == "approx":
+                    _COUNTER = (approximate_token_count, None)
+                else:
+                    try:
+                        counter = HuggingFaceTokenCounter(name)
+                        _COUNTER = (counter, counter.tokenizer.model_max_length)
+                    except Exception:
+                        logger.warning("Could not load tokenizer %r; sizing chunks by ~4 chars per token",
+                                       name, exc_info=True)
+                        _COUNTER = (approximate_token_count, None)
+    return _COUNTER
+
+
+def resolve_chunking(chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> Tuple[int, int]:
+    """Return the effective ``(chunk_size, chunk_overlap)`` in tokens.
+
+    Missing values come from settings; the size is clamped to the
+    tokenizer's limit.
+
+    Raises:
+        ValueError: if the size is not positive or the overlap is negative
+            or not smaller than the size.
+    """
+    chunk_size = chunk_size or settings.CHUNK_SIZE
+    chunk_overlap = settings.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+    if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+        raise ValueError(f"Need chunk_size > 0 and 0 <= chunk_overlap < chunk_size, "
+                         f"got {chunk_size} and {chunk_overlap}")
+
+    _, max_length = _get_counter()
+    # Tokenizers without a limit report a huge sentinel value.
+    if max_length and max_length < 1_000_000 and chunk_size > max_length - SPECIAL_TOKENS_MARGIN:
+        chunk_size = max_length - SPECIAL_TOKENS_MARGIN
+        chunk_overlap = min(chunk_overlap, chunk_size // 2)
+    return chunk_size, chunk_overlap
+
+
+def get_text_splitter(chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+    """Return the shared splitter for a chunk size and overlap in tokens."""
+    key = resolve_chunking(chunk_size, chunk_overlap)
+    splitter = _SPLITTERS.get(key)
+    if splitter is None:
+        counter, _ = _get_counter()
+        with _LOCK:
+            splitter = _SPLITTERS.get(key)
+            if splitter is None:
+                splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=key[0],
+                    chunk_overlap=key[1],
+                    length_function=counter,
+                )
+                _SPLITTERS[key] = splitter
+    return splitter
+
+
+def iter_split_documents(docs: Iterable[Document], chunk_size: Optional[int] = None,
+                         chunk_overlap: Optional[int] = None) -> Iterator[Document]:
+    """Yield the chunks of ``docs`` one document at a time."""
     splitter = get_text_splitter(chunk_size, chunk_overlap)
-    return splitter.split_documents(docs)
\ No newline at end of file
+    for doc in docs:
+        yield from splitter.split_documents([doc])
+
+
+def split_documents(docs, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[Document]:
+    """Split documents into chunks."""
+    return list(iter_split_documents(docs, chunk_size, chunk_overlap))
@@ -0,0 +1,62 @@
+"""Local token counters used for chat-history budgeting.
+
+History trimming used to route every message through the chat model's
+``get_num_tokens_from_messages`` on every turn. Token counts are now
+computed once, locally, when a message is appended to a session (see
+``services.session_store``). The counter is pluggable via
+``settings.HISTORY_TOKENIZER``:
+  - ``"approx"``: about four characters per token, no model download.
+  - any other value: the name of a HuggingFace tokenizer loaded with
+      ``transformers.AutoTokenizer``.
+"""
+
+import threading
+from typing import Callable, Optional
+
+from langchain_core.messages import BaseMessage
+
+from config import settings
+
+TokenCounter = Callable[[str], int]
+
+# Fixed per-message cost for role markers and separators, matching the
+# usual chat-format overhead.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def approximate_token_count(text: str) -> int:
+    """Estimate tokens as roughly one per four characters."""
+    return (len(text) + 3) // 4
+
+
+class HuggingFaceTokenCounter:
+    """Count tokens with a local HuggingFace tokenizer."""
+
+    def __init__(self, tokenizer_name: str):
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+
+    def __call__(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_message_tokens(message: BaseMessage, counter: TokenCounter) -> int:
+    """Return the token cost of a single chat message."""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return counter(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+_COUNTER: Optional[TokenCounter] = None
+_COUNTER_LOCK = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide token counter configured in settings."""
+    global _COUNTER
+    if _COUNTER is None:
+        with _COUNTER_LOCK:
+            if _COUNTER is None:
+                name = settings.HISTORY_TOKENIZER
+                _COUNTER = approximate_token_count if name == "approx" else HuggingFaceTokenCounter(name)
+    return _COUNTER
@@ -0,0 +1,315 @@
+"""Resumable, chunked uploads spooled to disk.
+
+``/upload`` takes whole files in one multipart request and the Streamlit
+client sends each PDF's full bytes, so several large PDFs at once were held
+in worker memory. Uploads can now be streamed in parts instead:
+  - ``start``: register an upload (file name, namespace, optional size and
+      SHA-256) and get an ``upload_id``.
+  - ``write_part``: append a part at a given offset. Bytes go straight to a
+      spool file under ``runtime/uploads`` and into a running SHA-256, so
+      no more than one network chunk is in memory. A part at the wrong
+      offset is rejected with the current offset, from which the client
+      resumes; ``status`` reports it too.
+  - ``finish``: check the size and hash and hand the spool file to
+      ingestion, which parses it from disk and deletes it afterwards.
+
+Upload state is kept in a small JSON file next to the spool file, so an
+upload survives a server restart (the hash is then recomputed from the
+spooled bytes). Uploads idle for ``UPLOAD_TTL_SECONDS`` are removed;
+spool files handed to ingestion are left to the job, which deletes them.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import IO, Dict, Optional, Set
+
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Read size when copying or re-hashing spooled files.
+_COPY_BUFFER = 1024 * 1024
+
+
+class UploadNotFoundError(KeyError):
+    """Raised for an unknown, finished or expired ``upload_id``."""
+
+
+class UploadOffsetError(ValueError):
+    """Raised when a part does not start where the spooled bytes end."""
+
+    def __init__(self, expected: int, got: int):
+        super().__init__(f"Part starts at offset {got}, expected {expected}")
+        self.expected = expected
+
+
+class UploadBusyError(RuntimeError):
+    """Raised when a part arrives while another part of the same upload is written."""
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload grows past its declared size or ``UPLOAD_MAX_BYTES``."""
+
+
+@dataclass
+class UploadSession:
+    """State of one chunked upload, persisted next to its spool file."""
+
+    upload_id: str
+    filename: str
+    namespace: Optional[str] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    received: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class UploadSpool:
+    """Spool directory holding in-progress uploads and files awaiting ingestion."""
+
+    def __init__(self, spool_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.spool_dir = spool_dir or os.path.join(settings.PROJECT_ROOT, "runtime", "uploads")
+        self.max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+        self.ttl_seconds = ttl_seconds or settings.UPLOAD_TTL_SECONDS
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._sessions: Dict[str, UploadSession] = {}
+        self._hashes: Dict[str, "hashlib._Hash"] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        # Spool files returned by finish()/spool(), deleted by their owner.
+        self._owned: Set[str] = set()
+        self._lock = threading.Lock()
+
+    # -- chunked uploads -------------------------------------------------
+
+    def start(self, filename: str, namespace: Optional[str] = None, size: Optional[int] = None,
+              sha256: Optional[str] = None) -> UploadSession:
+        """Register a new upload and create its empty spool file.
+
+        Raises:
+            UploadTooLargeError: if ``size`` exceeds ``UPLOAD_MAX_BYTES``.
+        """
+        if size is not None and size > self.max_bytes:
+            raise UploadTooLargeError(f"{filename} is {size} bytes, the limit is {self.max_bytes}")
+        self.sweep()
+        session = UploadSession(upload_id=uuid.uuid4().hex, filename=os.path.basename(filename),
+                                namespace=namespace, size=size, sha256=sha256.lower() if sha256 else None)
+        open(self._part_path(session.upload_id), "wb").close()
+        with self._lock:
+            self._sessions[session.upload_id] = session
+            self._hashes[session.upload_id] = hashlib.sha256()
+            self._locks[session.upload_id] = threading.Lock()
+        self._save(session)
+        return session
+
+    def status(self, upload_id: str) -> UploadSession:
+        """Return the upload's state, reloading it from disk after a restart.
+
+        Raises:
+            UploadNotFoundError: if the upload does not exist.
+        """
+        session = self._sessions.get(upload_id)
+        if session is None:
+            session = self._restore(upload_id)
+        return session
+
+    async def write_part(self, upload_id: str, offset: int, chunks) -> UploadSession:
+        """Append one part, streamed as an async iterable of ``bytes``, at ``offset``.
+
+        Each chunk is written and hashed as it arrives (e.g. from
+        ``Request.stream()``). If the stream breaks off, the bytes written so
+        far are kept and ``received`` tells the client where to resume.
+
+        Raises:
+            UploadNotFoundError: if the upload does not exist.
+            UploadBusyError: if another part of the upload is being written.
+            UploadOffsetError: if ``offset`` is not the number of bytes received.
+            UploadTooLargeError: if the part exceeds the declared or maximum size.
+        """
+        session = self.status(upload_id)
+        limit = session.size if session.size is not None else self.max_bytes
+        lock = self._locks[upload_id]
+        # Never wait for the lock: its holder may be awaiting on this event loop.
+        if not lock.acquire(blocking=False):
+            raise UploadBusyError(f"Another part of upload {upload_id} is being written")
+        try:
+            if offset != session.received:
+                raise UploadOffsetError(session.received, offset)
+            digest = self._hashes[upload_id]
+            with open(self._part_path(upload_id), "ab") as f:
+                async for chunk in chunks:
+                    if session.received + len(chunk) > limit:
+                        raise UploadTooLargeError(f"{session.filename} exceeds {limit} bytes")
+                    await asyncio.to_thread(f.write, chunk)
+                    digest.update(chunk)
+                    session.received += len(chunk)
+        finally:
+            session.updated_at = time.time()
+            self._save(session)
+            lock.release()
+        return session
+
+    def finish(self, upload_id: str) -> "SpooledFile":
+        """Close the upload and return its spool file for ingestion.
+
+        The upload is forgotten; the returned file is owned by the caller.
+
+        Raises:
+            UploadNotFoundError: if the upload does not exist.
+            UploadBusyError: if a part is still being written.
+            ValueError: if fewer bytes than the declared size arrived, or the
+                content does not match the declared SHA-256 (the upload is
+                then discarded).
+        """
+        session = self.status(upload_id)
+        lock = self._locks[upload_id]
+        if not lock.acquire(blocking=False):
+            raise UploadBusyError(f"A part of upload {upload_id} is still being written")
+        try:
+            if session.size is not None and session.received != session.size:
+                raise ValueError(f"Received {session.received} of {session.size} bytes")
+            sha256 = self._hashes[upload_id].hexdigest()
+            if session.sha256 and session.sha256 != sha256:
+                self.abort(upload_id)
+                raise ValueError(f"SHA-256 mismatch for {session.filename}: got {sha256}")
+            path = os.path.join(self.spool_dir, f"{upload_id}.pdf")
+            os.replace(self._part_path(upload_id), path)
+            with self._lock:
+                self._owned.add(path)
+            self._forget(upload_id)
+        finally:
+            lock.release()
+        return SpooledFile(session.filename, path, sha256, session.received)
+
+    def abort(self, upload_id: str):
+        """Discard an upload and its spooled bytes."""
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+            self._hashes.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+
+    def sweep(self):
+        """Remove uploads and spool files untouched for ``ttl_seconds``.
+
+        Files returned by ``finish``/``spool`` are skipped while they exist,
+        since an ingestion job may still be waiting to parse them.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self._owned = {path for path in self._owned if os.path.exists(path)}
+            owned = set(self._owned)
+        # Newest modification time of each upload's .part and .json files.
+        uploads: Dict[str, float] = {}
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            if path in owned:
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+                upload_id, _, ext = name.partition(".")
+                if ext in ("part", "json"):
+                    uploads[upload_id] = max(mtime, uploads.get(upload_id, mtime))
+                elif mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+        for upload_id, mtime in uploads.items():
+            if mtime < cutoff:
+                self.abort(upload_id)
+
+    # -- whole-file uploads ------------------------------------------------
+
+    def spool(self, filename: str, stream: IO[bytes]) -> "SpooledFile":
+        """Copy a file-like upload to the spool directory, hashing it on the way."""
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.pdf")
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "wb") as f:
+            while chunk := stream.read(_COPY_BUFFER):
+                if size + len(chunk) > self.max_bytes:
+                    f.close()
+                    os.remove(path)
+                    raise UploadTooLargeError(f"{filename} exceeds {self.max_bytes} bytes")
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        with self._lock:
+            self._owned.add(path)
+        return SpooledFile(os.path.basename(filename or "upload.pdf"), path, digest.hexdigest(), size)
+
+    # -- internals ---------------------------------------------------------
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{upload_id}.json")
+
+    def _save(self, session: UploadSession):
+        tmp_path = self._meta_path(session.upload_id) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session.to_dict(), f)
+        os.replace(tmp_path, self._meta_path(session.upload_id))
+
+    def _restore(self, upload_id: str) -> UploadSession:
+        if not upload_id.isalnum():
+            raise UploadNotFoundError(upload_id)
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                return session
+            try:
+                with open(self._meta_path(upload_id), encoding="utf-8") as f:
+                    session = UploadSession(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                raise UploadNotFoundError(upload_id)
+            # Recompute the running hash from what was spooled before the restart.
+            digest = hashlib.sha256()
+            size = 0
+            with open(self._part_path(upload_id), "rb") as f:
+                while chunk := f.read(_COPY_BUFFER):
+                    digest.update(chunk)
+                    size += len(chunk)
+            session.received = size
+            self._sessions[upload_id] = session
+            self._hashes[upload_id] = digest
+            self._locks.setdefault(upload_id, threading.Lock())
+        logger.info("Resumed upload %s of %s at %d bytes", upload_id, session.filename, size)
+        return session
+
+    def _forget(self, upload_id: str):
+        if os.path.exists(self._meta_path(upload_id)):
+            os.remove(self._meta_path(upload_id))
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+            self._hashes.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+
+
+@dataclass
+class SpooledFile:
+    """A complete upload on disk, ready for ingestion."""
+
+    filename: str
+    path: str
+    sha256: str
+    size: int
+
+    def discard(self):
+        """Delete the spooled file (e.g. when its content is already indexed)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
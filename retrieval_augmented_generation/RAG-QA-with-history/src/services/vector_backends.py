@@ -0,0 +1,101 @@
+"""Pluggable storage backends for ``VectorStoreManager``.
+
+Both backends expose a LangChain ``VectorStore`` as ``backend.store`` (used
+for adding documents and building retrievers); this module adds the few
+store-specific operations the manager needs on top of that:
+  - ``existing_ids``: which of a set of chunk ids are already stored.
+  - ``count``: number of stored chunks, without loading rows.
+  - ``rows``: a full scan, used only for one-off index rebuilds.
+  - ``drop``: delete the stored vectors of the partition.
+
+Every backend is opened for one namespace partition; ``namespace=None`` is
+the default partition that predates namespaces, so existing stores keep
+working unchanged.
+
+Backends:
+  - ``"chroma"``: one collection per namespace in the persistent Chroma
+      client at ``persist_dir`` (the default partition is the ``langchain``
+      collection).
+  - ``"local"``: ``LocalVectorIndex``, a memory-mapped float16/int8 index
+      in ``namespace_path(persist_dir, namespace)/local_index``.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional, Set
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+DEFAULT_COLLECTION = "langchain"
+
+
+def namespace_path(persist_dir: str, namespace: Optional[str]) -> str:
+    """Return the directory holding a namespace's files (``persist_dir`` for the default)."""
+    return persist_dir if namespace is None else os.path.join(persist_dir, "namespaces", namespace)
+
+
+class VectorBackend(ABC):
+    """Store-specific operations on top of a LangChain ``VectorStore``."""
+
+    name = "base"
+
+    def __init__(self, store: VectorStore):
+        self.store = store
+
+    def existing_ids(self, ids: Iterable[str]) -> Set[str]:
+        return set(self.store.get(ids=list(ids), include=[])["ids"])
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks."""
+
+    def rows(self, include: List[str]) -> dict:
+        return self.store.get(include=include)
+
+    def drop(self):
+        """Delete the stored vectors; files under the namespace path are removed by the caller."""
+
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+
+    def __init__(self, embeddings: Embeddings, persist_dir: str, namespace: Optional[str] = None):
+        from langchain_chroma import Chroma
+
+        collection_name = DEFAULT_COLLECTION if namespace is None else f"ns-{namespace}"
+        super().__init__(Chroma(collection_name=collection_name, embedding_function=embeddings,
+                                persist_directory=persist_dir))
+
+    def count(self) -> int:
+        # Collection count is a metadata query; it does not load any rows.
+        return self.store._collection.count()
+
+    def drop(self):
+        # All collections share one client and sqlite file, so the
+        # collection is deleted rather than its files.
+        self.store.delete_collection()
+
+
+class LocalIndexBackend(VectorBackend):
+    name = "local"
+
+    def __init__(self, embeddings: Embeddings, persist_dir: str, namespace: Optional[str] = None,
+                 dtype: str = "float16"):
+        from services.local_index import LocalVectorIndex
+
+        path = os.path.join(namespace_path(persist_dir, namespace), "local_index")
+        super().__init__(LocalVectorIndex(embeddings, path, dtype=dtype))
+
+    def count(self) -> int:
+        return self.store.count()
+
+
+def create_backend(kind: str, embeddings: Embeddings, persist_dir: str, namespace: Optional[str] = None,
+                   **kwargs) -> VectorBackend:
+    """Return the backend called ``kind`` (``"chroma"`` or ``"local"``) for a namespace."""
+    if kind == "chroma":
+        return ChromaBackend(embeddings, persist_dir, namespace)
+    if kind == "local":
+        return LocalIndexBackend(embeddings, persist_dir, namespace, **kwargs)
+    raise ValueError(f"Unknown vector backend {kind!r}; expected 'chroma' or 'local'")
@@ -1,66 +1,234 @@
-"""Vector store manager backed by Chroma.
+"""Vector store manager backed by Chroma or a local memory-mapped index.
 
 This module provides a thin wrapper, ``VectorStoreManager``, around a
-Chroma vector store instance to centralize initialization, persistence
+vector store instance to centralize initialization, persistence
 directory handling, and common helper operations used by the RAG pipeline.
-  - Create and initialize the Chroma store with a chosen embedding model.
+  - Create and initialize the store with a chosen embedding model. The
+      storage backend (``VECTOR_BACKEND``) is pluggable, see
+      ``services.vector_backends``.
   - Provide a convenience ``as_retriever`` method tuned for MMR search.
   - Add documents and report an approximate document count.
+
+Chunks are content-addressed: each one is stored under the SHA-256 of its
+text, so re-uploading a PDF (or a shared boilerplate page) is a no-op.
+Embeddings go through an on-disk cache keyed by (embedding model, text
+hash) that lives outside ``persist_dir``, so rebuilding the store never
+recomputes vectors it has already seen.
+
+A BM25 inverted index over the same chunks is maintained alongside the
+collection (``persist_dir/bm25_index.json`` and its append log) so ``as_retriever`` can serve
+hybrid lexical + vector retrieval.
+
+Collection statistics (chunks per source file, embedding dimension) are
+kept as counters in ``persist_dir/stats.json`` and updated on every add, so
+``count`` and ``stats`` never scan the stored rows. The same file records
+the SHA-256 of every fully indexed upload, so clients can skip re-sending
+a file (``has_file``).
+
+``add_documents`` records the time spent embedding new chunks and writing
+them to the store in the ``utils.metrics`` ingestion histograms.
+
+A manager serves one namespace (document set); ``services.namespaces``
+opens one per namespace on demand, all sharing a single embedding model
+built by ``build_embeddings``.
 """
 
+import hashlib
+import json
 import os
-from typing import List, Optional
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from config import settings
+from services.bm25_index import BM25Index, HybridRetriever
+from services.embedding_batcher import MicroBatchingEmbeddings, query_batch_fn
+from services.vector_backends import VectorBackend, create_backend, namespace_path
 from utils.logger import get_logger
+from utils.metrics import INGEST_STAGE_SECONDS
 
 os.environ["HF_TOKEN"] = settings.HF_TOKEN
 logger = get_logger(__name__)
 
 
+def default_search_kwargs() -> dict:
+    """Return the MMR search kwargs configured in project settings."""
+    return {
+        "k": settings.RETRIEVER_K,
+        "lambda_mult": settings.RETRIEVER_LAMBDA_MULT,
+        "fetch_k": settings.RETRIEVER_FETCH_K,
+    }
+
+
+def chunk_id(text: str) -> str:
+    """Return the deterministic, content-derived id of a chunk."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _QueryMemoEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes the most recent query embeddings.
+
+    Lets callers embed a question (e.g. for the answer cache) and have the
+    retriever reuse that vector instead of running the model twice.
+    Document embedding time is accumulated per thread so ``add_documents``
+    can tell it apart from the store write.
+    """
+
+    def __init__(self, embeddings: Embeddings, size: int = 256):
+        self.embeddings = embeddings
+        self.size = size
+        self._memo: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._timing = threading.local()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self._timing.seconds = self.pop_document_seconds() + time.perf_counter() - start
+
+    def pop_document_seconds(self) -> float:
+        """Return and reset this thread's accumulated document embedding time."""
+        seconds = getattr(self._timing, "seconds", 0.0)
+        self._timing.seconds = 0.0
+        return seconds
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self._memo.get(text)
+            if vector is not None:
+                self._memo.move_to_end(text)
+                return vector
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._memo[text] = vector
+            if len(self._memo) > self.size:
+                self._memo.popitem(last=False)
+        return vector
+
+
+def build_embeddings(embedding_model: Optional[str] = None,
+                     cache_dir: Optional[str] = None) -> "_QueryMemoEmbeddings":
+    """Create the embedding function shared by every namespace's store.
+
+    Currently uses HuggingFaceEmbeddings with a model identifier, wrapped
+    in a ``CacheBackedEmbeddings`` whose namespace is the model name.
+    With ``EMBED_BATCH_ENABLED`` query embeddings from concurrent requests
+    go through a ``MicroBatchingEmbeddings`` batcher.
+    Swap in a different embedding provider here if desired.
+    """
+    embedding_model = embedding_model or settings.EMBEDDING_MODEL
+    # Embedding cache is kept next to (not inside) persist_dir
+    cache_dir = cache_dir or settings.EMBEDDING_CACHE_DIR or os.path.join(
+        settings.PROJECT_ROOT, "embedding_cache")
+    hf_embeddings = HuggingFaceEmbeddings(model_name = embedding_model)
+    embeddings = CacheBackedEmbeddings.from_bytes_store(
+        hf_embeddings,
+        LocalFileStore(cache_dir),
+        namespace=embedding_model,
+        key_encoder="sha256",
+    )
+    if settings.EMBED_BATCH_ENABLED:
+        embeddings = MicroBatchingEmbeddings(
+            embeddings,
+            batch_query_fn=query_batch_fn(hf_embeddings),
+            max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBED_BATCH_WAIT_MS,
+        )
+    return _QueryMemoEmbeddings(embeddings)
+
+
 class VectorStoreManager:
-    """Encapsulate a persistent Chroma vector store.
+    """Encapsulate a persistent vector store (Chroma or local index).
 
     This class centralizes setup and common operations. It intentionally
     keeps a small surface area: initialization, adding documents,
     returning a retriever, and a simple count method.
 
     Public methods
-    - add_documents(docs: List[Document]) -> None
-      Persist a batch of Document objects to the vector store. No-op on
-      empty input.
+    - add_documents(docs: List[Document]) -> int
+      Persist a batch of Document objects to the vector store, skipping
+      chunks that are already indexed. Returns the number of new chunks.
 
-    - as_retriever(search_kwargs: Optional[dict]) -> Retriever
-      Return a configured retriever instance using MMR search. Accepts
-      optional ``search_kwargs`` passed to Chroma's retriever factory.
+    - as_retriever(search_kwargs: Optional[dict], mode: Optional[str]) -> Retriever
+      Return a configured retriever instance using MMR search, or hybrid
+      BM25 + vector search when ``mode`` (default ``RETRIEVER_MODE``) is
+      ``"hybrid"``. Accepts optional ``search_kwargs``.
 
     - count() -> int
       Return the number of stored document ids, or 0 on error.
+
+    - stats() -> dict
+      Return chunk count, source-document count, on-disk size and
+      embedding dimension from maintained counters.
+
+    - get_chunks(ids: List[str]) -> List[Document]
+      Load stored chunks by id.
+
+    - has_file(sha256: str) -> bool / record_file(sha256: str, filename: str) -> None
+      Check or record that an uploaded file with this content hash has
+      been fully indexed.
+
+    - embed_query(text: str) -> List[float]
+      Embed a query with the store's embedding function (memoized, so the
+      retriever reuses the vector for the same text).
+
+    - add_change_listener(callback: Callable[[str], None]) -> None
+      Register a callback run with the namespace whenever ``add_documents``
+      adds new chunks or the namespace is dropped.
+
+    - drop() -> None
+      Delete every chunk of this namespace, on disk and in the store.
     """
 
-    def __init__(self, embedding_model: Optional[str] = None):
+    def __init__(self, embedding_model: Optional[str] = None, namespace: Optional[str] = None,
+                 embeddings: Optional[Embeddings] = None):
         # Use provided model name or fall back to project settings
         self.embedding_model = embedding_model or settings.EMBEDDING_MODEL
+        self.namespace = namespace or settings.DEFAULT_NAMESPACE
+        # The default namespace is the pre-namespace store; others get their
+        # own partition and directory under persist_dir/namespaces.
+        self.partition = None if self.namespace == settings.DEFAULT_NAMESPACE else self.namespace
         # Persist directory is located under PROJECT_ROOT/persist_dir
-        self.persist_dir = os.path.join(settings.PROJECT_ROOT, "persist_dir")
+        self.root_dir = os.path.join(settings.PROJECT_ROOT, "persist_dir")
+        self.persist_dir = namespace_path(self.root_dir, self.partition)
+        # Shared embeddings (see ``build_embeddings``); built here if not given
+        self.embeddings = embeddings
+        self.backend: Optional[VectorBackend] = None
         self.store = None
+        self.bm25 = None
+        self._stats_path = os.path.join(self.persist_dir, "stats.json")
+        self._stats_lock = threading.Lock()
+        self._stats = None
+        self._change_listeners: List[Callable[[str], None]] = []
         self._init_store()
 
     def _init_store(self):
-        """Initialize the Chroma store and embeddings if not already set.
-        
-        Currently uses HuggingFaceEmbeddings with a model identifier.
-        Swap in a different embedding provider here if desired.
-        """
+        """Initialize the vector store (and embeddings if not given)."""
         if self.store is None:
-            embeddings = HuggingFaceEmbeddings(model_name = self.embedding_model)
-            self.store = Chroma(
-                embedding_function=embeddings,
-                persist_directory=self.persist_dir
-            )
-            logger.info("Initialized Chroma vectorstore at %s", self.persist_dir)
+            if self.embeddings is None:
+                self.embeddings = build_embeddings(self.embedding_model)
+            kwargs = {"dtype": settings.LOCAL_INDEX_DTYPE} if settings.VECTOR_BACKEND == "local" else {}
+            self.backend = create_backend(settings.VECTOR_BACKEND, self.embeddings, self.root_dir,
+                                          self.partition, **kwargs)
+            self.store = self.backend.store
+            logger.info("Initialized %s vectorstore for namespace %r at %s",
+                        self.backend.name, self.namespace, self.persist_dir)
+
+        if self.bm25 is None:
+            self.bm25 = BM25Index(os.path.join(self.persist_dir, "bm25_index.json"))
+            if not len(self.bm25) and self.count():
+                # Store predates the lexical index: build it once from the rows.
+                logger.info("Building BM25 index from stored chunks")
+                data = self.backend.rows(include=["documents"])
+                self.bm25.add(data["ids"], data["documents"])
 
     def add_documents(self, docs: List[Document]):
         """Add a list of LangChain Document objects to the vectorstore.
@@ -70,29 +238,191 @@ class VectorStoreManager:
 
         Behavior:
             - If ``docs`` is empty or falsy, the method is a no-op.
-            - Delegates to Chroma's ``add_documents`` method for persistence.
+            - Each chunk gets ``chunk_id(page_content)`` as its id; duplicates
+              within the batch and chunks already in the store are skipped
+              before anything is embedded.
+            - Delegates to the store's ``add_documents`` method for persistence.
+
+        Returns:
+            The number of chunks actually added.
         """
         if not docs:
-            return
-        self.store.add_documents(docs)
+            return 0
+
+        unique = {}
+        for doc in docs:
+            unique.setdefault(chunk_id(doc.page_content), doc)
+
+        existing = self.backend.existing_ids(unique)
+        new_ids = [i for i in unique if i not in existing]
+        if not new_ids:
+            logger.info("All %d chunks already indexed; nothing to add", len(unique))
+            return 0
+
+        new_docs = [unique[i] for i in new_ids]
+        # Load (or rebuild) the counters before writing, so a rebuild from
+        # stored rows does not count this batch twice.
+        self._get_stats()
+        embeddings = self.store.embeddings
+        start = time.perf_counter()
+        self.store.add_documents(new_docs, ids=new_ids)
+        self.bm25.add(new_ids, [doc.page_content for doc in new_docs])
+        self._record_added(new_docs)
+        # The store embeds inside ``add_documents``; split that call into
+        # the embedding time and the rest (store, BM25 and stats writes).
+        embed_seconds = embeddings.pop_document_seconds() if isinstance(embeddings, _QueryMemoEmbeddings) else 0.0
+        INGEST_STAGE_SECONDS.observe(embed_seconds, stage="embed")
+        INGEST_STAGE_SECONDS.observe(time.perf_counter() - start - embed_seconds, stage="write")
+        for callback in self._change_listeners:
+            callback(self.namespace)
+        logger.info("Indexed %d new chunks (%d duplicates skipped)",
+                    len(new_ids), len(docs) - len(new_ids))
+        return len(new_ids)
 
-    def as_retriever(self, search_kwargs=None):
-        """Return a retriever configured for MMR search.
+    def as_retriever(self, search_kwargs=None, mode: Optional[str] = None):
+        """Return a retriever configured for MMR or hybrid search.
 
-        The default search kwargs are tuned to return a compact set of
-        candidates (k=3) with MMR diversity. Pass ``search_kwargs`` to
-        override defaults when needed.
+        The default search kwargs come from ``default_search_kwargs`` and
+        return a compact set of candidates (k=3) with MMR diversity. Pass
+        ``search_kwargs`` to override defaults when needed.
+
+        With ``mode="hybrid"`` the top ``fetch_k`` dense and BM25 candidates
+        are fused with reciprocal rank fusion and the best ``k`` returned.
         """
-        return self.store.as_retriever(search_type='mmr', search_kwargs=search_kwargs or {"k": 3, "lambda_mult": 0.4, "fetch_k": 10})
+        search_kwargs = search_kwargs or default_search_kwargs()
+        mode = mode or settings.RETRIEVER_MODE
+        if mode == "hybrid":
+            return HybridRetriever(
+                vector_search=lambda query, n: self.store.similarity_search(query, k=n),
+                bm25=self.bm25,
+                get_by_ids=self.store.get_by_ids,
+                k=search_kwargs.get("k", settings.RETRIEVER_K),
+                candidates=search_kwargs.get("fetch_k", settings.RETRIEVER_FETCH_K),
+            )
+        return self.store.as_retriever(search_type='mmr', search_kwargs=search_kwargs)
     
+    def embed_query(self, text: str) -> List[float]:
+        """Embed ``text`` as a query with the store's embedding function."""
+        return self.store.embeddings.embed_query(text)
+
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Call ``callback(namespace)`` whenever chunks are added to the store or it is dropped."""
+        self._change_listeners.append(callback)
+
+    def drop(self):
+        """Delete this namespace's vectors, lexical index and counters.
+
+        The manager must not be used afterwards; open a new one instead.
+        """
+        self.backend.drop()
+        if self.partition is None:
+            # The default namespace shares persist_dir with the Chroma client
+            # and other namespaces, so only its own files are removed.
+            for name in ("bm25_index.json", "bm25_index.json.log", "stats.json"):
+                path = os.path.join(self.persist_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(os.path.join(self.persist_dir, "local_index"), ignore_errors=True)
+        else:
+            shutil.rmtree(self.persist_dir, ignore_errors=True)
+        logger.info("Dropped namespace %r", self.namespace)
+        for callback in self._change_listeners:
+            callback(self.namespace)
+
     def count(self):
         """Return the number of stored documents.
 
+        Uses the backend's own count, which does not load any rows.
         Returns 0 if the store is not yet initialized or on error.
         """
         try:
-            data = self.store.get()
-            return len(data.get("ids", []))
+            return self.backend.count()
         except Exception:
             return 0
-        
\ No newline at end of file
+
+    def stats(self) -> dict:
+        """Return collection statistics without loading stored rows."""
+        stats = self._get_stats()
+        if stats["embedding_dimension"] is None:
+            # One-off probe; the result is persisted with the counters.
+            with self._stats_lock:
+                stats["embedding_dimension"] = len(self.store.embeddings.embed_query("dimension probe"))
+                self._save_stats()
+
+        # Other namespaces live under the default namespace's directory.
+        skip = os.path.join(self.persist_dir, "namespaces") if self.partition is None else None
+        return {
+            "namespace": self.namespace,
+            "chunks": self.count(),
+            "source_documents": len(stats["sources"]),
+            "indexed_files": len(stats.get("files", {})),
+            "disk_bytes": _dir_size(self.persist_dir, skip),
+            "embedding_model": self.embedding_model,
+            "embedding_dimension": stats["embedding_dimension"],
+        }
+
+    def get_chunks(self, ids: List[str]) -> List[Document]:
+        """Return the stored chunks with the given ids (unknown ids are skipped)."""
+        return self.store.get_by_ids(ids)
+
+    def has_file(self, sha256: str) -> bool:
+        """Return whether a file with content hash ``sha256`` was fully indexed."""
+        return sha256.lower() in self._get_stats().get("files", {})
+
+    def record_file(self, sha256: str, filename: str):
+        """Record that the file ``filename`` with hash ``sha256`` is fully indexed."""
+        stats = self._get_stats()
+        with self._stats_lock:
+            stats.setdefault("files", {})[sha256.lower()] = filename
+            self._save_stats()
+
+    def _get_stats(self) -> dict:
+        if self._stats is None:
+            with self._stats_lock:
+                if self._stats is None:
+                    self._stats = self._load_stats()
+        return self._stats
+
+    def _load_stats(self) -> dict:
+        if os.path.exists(self._stats_path):
+            with open(self._stats_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        stats = {"sources": {}, "embedding_dimension": None, "files": {}}
+        if self.count():
+            # Store predates the counters: rebuild them once from metadata.
+            logger.info("Rebuilding collection stats from stored metadata")
+            for meta in self.backend.rows(include=["metadatas"])["metadatas"]:
+                source = (meta or {}).get("source", "unknown")
+                stats["sources"][source] = stats["sources"].get(source, 0) + 1
+        self._stats = stats
+        self._save_stats()
+        return stats
+
+    def _save_stats(self):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        tmp_path = self._stats_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._stats, f)
+        os.replace(tmp_path, self._stats_path)
+
+    def _record_added(self, docs: List[Document]):
+        stats = self._get_stats()
+        with self._stats_lock:
+            for doc in docs:
+                source = doc.metadata.get("source", "unknown")
+                stats["sources"][source] = stats["sources"].get(source, 0) + 1
+            self._save_stats()
+
+
+def _dir_size(path: str, skip: Optional[str] = None) -> int:
+    """Return the total size in bytes of the files under ``path``, except under ``skip``."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != skip]
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,180 @@
+# src/utils/metrics.py
+"""
+metrics.py
+------------
+In-process metrics for the RAG-QA-with-History API.
+- ``Counter`` and ``Histogram`` with Prometheus-style labels.
+- ``REGISTRY.render()`` returns the Prometheus text exposition format
+  served by ``/api/rag/metrics``.
+- The metrics the app records are defined at the bottom of this module.
+
+Metrics live in the process; with several uvicorn workers each worker
+reports its own values.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds, from a cached answer up to a slow LLM call or a large PDF.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{self._format_labels(values)} {_fmt(total)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock seconds spent in the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            series = sorted((values, (list(counts), total)) for values, (counts, total) in self._series.items())
+        for values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _fmt(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(values, (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(values)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(values)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+
+# Requests
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_request_seconds", "End-to-end handling time of API requests.", ["endpoint"])
+
+# Chat chain
+CHAIN_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_chain_stage_seconds",
+    "Time spent per RAG chain stage (history, rewrite, retrieve, cache_lookup, compress, stuff, answer, llm).",
+    ["stage"])
+LLM_TOKENS = REGISTRY.histogram(
+    "rag_llm_tokens", "Tokens per LLM call, when the provider reports usage.", ["kind"], COUNT_BUCKETS)
+RETRIEVED_CHUNKS = REGISTRY.histogram(
+    "rag_retrieved_chunks", "Chunks returned per retrieval.", buckets=COUNT_BUCKETS)
+CONTEXT_TOKENS = REGISTRY.counter(
+    "rag_context_tokens_total",
+    "Context tokens sent to the answer prompt before and after compression (original, kept, saved).",
+    ["kind"])
+
+# Ingestion
+INGEST_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_ingest_stage_seconds", "Time spent per ingestion step (parse, split, embed, write).", ["stage"])
+INGEST_BATCH_CHUNKS = REGISTRY.histogram(
+    "rag_ingest_batch_chunks", "Chunks per vector store write batch.", buckets=COUNT_BUCKETS)
+INGEST_CHUNKS = REGISTRY.counter(
+    "rag_ingest_chunks_total", "Chunks seen by ingestion, by outcome (embedded, skipped).", ["outcome"])
+INGEST_PAGES = REGISTRY.counter("rag_ingest_pages_total", "PDF pages parsed by ingestion.")
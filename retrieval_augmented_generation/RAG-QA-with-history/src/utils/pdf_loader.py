@@ -1,17 +1,150 @@
 """Small helpers to load uploaded PDF files into LangChain Documents.
 
-This module provides a single helper, ``load_uploaded_pdfs``, which accepts
-a list of FastAPI ``UploadFile`` objects, writes each upload to a temporary
-PDF file, and uses ``PyMuPDFLoader`` to convert the PDF into a list of
-``langchain_core.documents.Document`` objects.
+PDFs are opened straight from memory with PyMuPDF (``pymupdf.open(stream=...)``),
+or from a file path for uploads spooled to disk (``services.uploads``), in
+which case workers open the file themselves instead of receiving its bytes.
+Large files are cut into page ranges and the ranges of all files are parsed
+in parallel on a shared process pool. Pool workers are spawned, not forked,
+as the server process runs threads and holds model state that must not be
+copied mid-operation, and they always receive a file path: in-memory PDFs
+are written to a temporary file once rather than pickled into every range.
+  - ``iter_pdf_documents`` yields one ``Document`` per page, lazily and in
+      order, so callers can split and embed while later pages are parsed.
+  - ``load_uploaded_pdfs`` and ``load_pdf_bytes`` are list-returning
+      convenience wrappers for FastAPI uploads and raw bytes.
 """
 
+import multiprocessing
+import os
 import tempfile
-from typing import List
-from langchain_community.document_loaders import PyMuPDFLoader
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pymupdf
 from langchain_core.documents import Document
 from fastapi import UploadFile
 
+from config import settings
+
+PdfSource = Tuple[str, Union[bytes, str, "os.PathLike[str]", IO[bytes]]]
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared parsing pool, or ``None`` when parsing in-process."""
+    global _POOL
+    workers = settings.PDF_PARSE_WORKERS
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) // 2)
+    if workers <= 1:
+        return None
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def _as_input(content) -> Union[bytes, str]:
+    """Return a file path as ``str``, or the bytes of an in-memory or spooled upload buffer."""
+    if isinstance(content, (str, os.PathLike)):
+        return os.fspath(content)
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return bytes(content)
+    content.seek(0)
+    return content.read()
+
+
+def _open(content: Union[bytes, str]) -> pymupdf.Document:
+    if isinstance(content, str):
+        return pymupdf.open(content, filetype="pdf")
+    return pymupdf.open(stream=content, filetype="pdf")
+
+
+def _parse_page_range(filename: str, content: Union[bytes, str], start: int, stop: int) -> List[Document]:
+    """Parse pages ``[start, stop)`` of a PDF given as bytes or a file path.
+
+    Runs in a worker process, so it only takes picklable arguments.
+    Metadata mirrors what ``PyMuPDFLoader`` produces.
+    """
+    docs = []
+    with _open(content) as pdf:
+        file_meta = {k.lower(): v for k, v in (pdf.metadata or {}).items() if v}
+        for number in range(start, stop):
+            docs.append(Document(
+                page_content=pdf[number].get_text(),
+                metadata={
+                    **file_meta,
+                    "source": filename,
+                    "file_path": filename,
+                    "page": number,
+                    "total_pages": pdf.page_count,
+                },
+            ))
+    return docs
+
+
+def _page_ranges(filename: str, content: Union[bytes, str], pages_per_task: int):
+    with _open(content) as pdf:
+        page_count = pdf.page_count
+    for start in range(0, page_count, pages_per_task):
+        yield filename, content, start, min(start + pages_per_task, page_count)
+
+
+def _spill_to_files(tasks: List[tuple], temp_paths: List[str]) -> List[tuple]:
+    """Replace in-memory PDF contents in ``tasks`` with a temporary file per PDF."""
+    paths = {}
+    spilled = []
+    for filename, content, start, stop in tasks:
+        if isinstance(content, bytes):
+            if id(content) not in paths:
+                fd, path = tempfile.mkstemp(suffix=".pdf")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                temp_paths.append(path)
+                paths[id(content)] = path
+            content = paths[id(content)]
+        spilled.append((filename, content, start, stop))
+    return spilled
+
+
+def iter_pdf_documents(sources: Sequence[PdfSource], pages_per_task: Optional[int] = None) -> Iterator[Document]:
+    """Yield one ``Document`` per page for each ``(filename, content)`` source.
+
+    Args:
+        sources: ``(filename, content)`` pairs where content is ``bytes``, a
+            file path or a readable binary buffer (e.g. ``UploadFile.file``).
+        pages_per_task: Page-range size handed to a single worker. Defaults to
+            ``settings.PDF_PAGES_PER_TASK``.
+
+    Pages are yielded in file and page order. With a process pool, ranges
+    are parsed concurrently and each one is yielded as soon as it and all
+    earlier ranges are done.
+    """
+    pages_per_task = pages_per_task or settings.PDF_PAGES_PER_TASK
+    tasks = [
+        task
+        for filename, content in sources
+        for task in _page_ranges(filename, _as_input(content), pages_per_task)
+    ]
+
+    pool = _get_pool()
+    temp_paths: List[str] = []
+    try:
+        if pool is None or len(tasks) <= 1:
+            results = (_parse_page_range(*task) for task in tasks)
+        else:
+            results = pool.map(_parse_page_range, *zip(*_spill_to_files(tasks, temp_paths)))
+
+        for docs in results:
+            yield from docs
+    finally:
+        for path in temp_paths:
+            os.remove(path)
+
 
 def load_uploaded_pdfs(uploaded_files: List[UploadFile]):
     """Load uploaded PDF files into LangChain Document objects.
@@ -21,24 +154,20 @@ def load_uploaded_pdfs(uploaded_files: List[UploadFile]):
             received from a form/file upload endpoint).
 
     Returns:
-        A list of ``langchain_core.documents.Document`` instances produced by
-        the ``PyMuPDFLoader`` for each uploaded PDF.
-
-    Side effects:
-        - Writes each uploaded file to a temporary file on disk. Temporary
-          files are created with ``delete=False`` so they remain accessible
-          after closing; they are not removed by this function.
+        A list of ``langchain_core.documents.Document`` instances, one per
+        page, read directly from each upload's buffer.
     """
-    docs = []
-    for f in uploaded_files:
-        suffix = ".pdf"
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        if tmp:
-            content = f.file.read()
-            tmp.write(content)
-            tmp.flush()
-            tmp.close()
-            loader = PyMuPDFLoader(tmp.name)
-            docs.extend(loader.load())
+    return list(iter_pdf_documents([(f.filename, f.file) for f in uploaded_files]))
 
-    return docs
+
+def load_pdf_bytes(filename: str, content: bytes) -> List[Document]:
+    """Load a single PDF given as bytes into LangChain Document objects.
+
+    Args:
+        filename: Original file name, recorded as the ``source`` metadata.
+        content: Raw PDF bytes.
+
+    Returns:
+        One ``Document`` per page.
+    """
+    return list(iter_pdf_documents([(filename, content)]))
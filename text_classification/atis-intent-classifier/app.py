@@ -1,12 +1,117 @@
+import os
+import threading
 from flask import Flask, render_template, request, jsonify
 import pickle
-from model.feature_extraction import feature_gen
+from model.batcher import MicroBatcher
+from model.cache import LRUCache, normalize_text
+from model.feature_extraction import encoder_id, feature_gen, reset_encoder
 
 app = Flask(__name__)
 
+# Concurrent /predict requests are grouped into one DistilBERT pass of up to
+# BATCH_MAX_SIZE texts, waiting at most BATCH_MAX_WAIT_MS for a batch to fill.
+# BATCHING=0 encodes every request on its own, as before.
+BATCHING = os.environ.get('BATCHING', '1') != '0'
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+
+# Predictions are cached per normalised phrase (CACHE_SIZE=0 disables it);
+# entries expire after CACHE_TTL_SECONDS if set. TOP_K intents with their
+# probabilities are returned unless a request asks for another top_k.
+CACHE_SIZE = int(os.environ.get('CACHE_SIZE', 10000))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', 0))
+TOP_K = int(os.environ.get('TOP_K', 3))
+
+MODEL_PATH = 'model/intent_model.pkl'
+
+
+def load_classifier():
+    stat = os.stat(MODEL_PATH)
+    with open(MODEL_PATH, 'rb') as f:
+        return pickle.load(f), (stat.st_mtime_ns, stat.st_size)
+
+
 # Load classifier
-with open('model/intent_model.pkl', 'rb') as f:
-    intent_model = pickle.load(f)
+intent_model, model_version = load_classifier()
+encoder_version = encoder_id()
+
+# Load the encoder now rather than on the first request
+feature_gen('warm up')
+
+cache = LRUCache(CACHE_SIZE, CACHE_TTL_SECONDS) if CACHE_SIZE > 0 else None
+_reload_lock = threading.Lock()
+
+
+def check_for_updates():
+    """Reload intent_model.pkl or the encoder if they changed on disk, and drop cached predictions."""
+    global intent_model, model_version, encoder_version
+    stat = os.stat(MODEL_PATH)
+    if (stat.st_mtime_ns, stat.st_size) == model_version and encoder_id() == encoder_version:
+        return
+    with _reload_lock:
+        changed = False
+        stat = os.stat(MODEL_PATH)
+        if (stat.st_mtime_ns, stat.st_size) != model_version:
+            intent_model, model_version = load_classifier()
+            changed = True
+        if encoder_id() != encoder_version:
+            reset_encoder()
+            encoder_version = encoder_id()
+            changed = True
+        if changed and cache is not None:
+            cache.clear()
+
+
+def rank_intents(texts):
+    """
+    Run the encoder and classifier once over `texts` (normalised phrases).
+    Returns, per text, every intent with its probability, most likely first.
+    """
+    generation = cache.generation if cache is not None else None
+    model = intent_model
+    unique = list(dict.fromkeys(texts))
+    probas = model.predict_proba(feature_gen(unique))
+
+    rankings = {}
+    for text, proba in zip(unique, probas):
+        ranking = sorted(zip(model.classes_, proba), key=lambda p: p[1], reverse=True)
+        rankings[text] = [(str(intent), float(p)) for intent, p in ranking]
+        if cache is not None:
+            cache.put(text, rankings[text], generation)
+    return [rankings[text] for text in texts]
+
+
+def predict_rankings(texts):
+    """Intent rankings for `texts`, from the cache where possible."""
+    check_for_updates()
+    keys = [normalize_text(text) for text in texts]
+    rankings = [cache.get(key) for key in keys] if cache is not None else [None] * len(keys)
+    missing = [i for i, ranking in enumerate(rankings) if ranking is None]
+    if not missing:
+        return rankings
+
+    missing_keys = [keys[i] for i in missing]
+    if batcher is not None:
+        # Shares the queue with other requests, so one worker owns the encoder.
+        computed = batcher.predict(missing_keys)
+    else:
+        computed = []
+        for start in range(0, len(missing_keys), BATCH_MAX_SIZE):
+            computed.extend(rank_intents(missing_keys[start:start + BATCH_MAX_SIZE]))
+    for i, ranking in zip(missing, computed):
+        rankings[i] = ranking
+    return rankings
+
+
+def top_k_payload(ranking, k):
+    return [{'intent': intent, 'probability': round(p, 4)} for intent, p in ranking[:k]]
+
+
+# Looked up at call time, so a reloaded model or encoder is picked up.
+batcher = MicroBatcher(lambda texts: rank_intents(texts),
+                       max_batch_size=BATCH_MAX_SIZE,
+                       max_wait_ms=BATCH_MAX_WAIT_MS) if BATCHING else None
+
 
 @app.route('/')
 def index():
@@ -16,12 +121,39 @@ def index():
 def predict():
     data = request.get_json()
     text = data['text']
+    top_k = data.get('top_k', TOP_K)
+    if not isinstance(top_k, int) or top_k < 0:
+        return jsonify({'error': "'top_k' must be a non-negative integer"}), 400
+
+    ranking = predict_rankings([text])[0]
+
+    response = {'intent': ranking[0][0]}
+    if top_k:
+        response['top_k'] = top_k_payload(ranking, top_k)
+    return jsonify(response)
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    data = request.get_json()
+    texts = data.get('texts')
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({'error': "'texts' must be a list of strings"}), 400
+    top_k = data.get('top_k', TOP_K)
+    if not isinstance(top_k, int) or top_k < 0:
+        return jsonify({'error': "'top_k' must be a non-negative integer"}), 400
+
+    rankings = predict_rankings(texts)
 
-    features = feature_gen(text)
-    prediction = intent_model.predict(features)
-    predicted_intent = prediction[0]
+    response = {'intents': [ranking[0][0] for ranking in rankings]}
+    if top_k:
+        response['top_k'] = [top_k_payload(ranking, top_k) for ranking in rankings]
+    return jsonify(response)
 
-    return jsonify({'intent': predicted_intent})
+@app.route('/cache/stats')
+def cache_stats():
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.stats()})
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)
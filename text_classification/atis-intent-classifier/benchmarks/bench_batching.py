@@ -0,0 +1,85 @@
+"""Padding and throughput of feature extraction on the ATIS train set.
+
+Embeds every phrase of atis_intents_train.csv two ways:
+  - before: the slow Python DistilBertTokenizer on shuffled batches of
+      `--batch-size`, each padded to its longest phrase (the previous
+      cls_train.py path)
+  - after:  feature_gen_batch: fast tokenizer, batches of similar token
+      length, embeddings returned in the original order
+
+and reports real and padded tokens, tokenizer time and sentences/sec.
+`max_abs_diff` compares the two embedding matrices row by row, checking
+that the original order is kept. ENCODER_BACKEND and ENCODER_THREADS
+apply as in the app.
+
+Usage (from the project root):
+    ENCODER_THREADS=4 python benchmarks/bench_batching.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def padding_report(lengths, batches):
+    real = int(sum(lengths))
+    padded = int(sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)) - real
+    return {"real_tokens": real, "padded_tokens": padded, "padding_pct": round(100 * padded / (real + padded), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import numpy as np
+    import pandas as pd
+    from transformers import DistilBertTokenizer
+    from model.feature_extraction import feature_gen_batch, get_encoder, model_path, tokenizer
+
+    texts = pd.read_csv(os.path.join(ROOT, "data", "atis_intents_train.csv"))["text"].tolist()
+    slow_tokenizer = DistilBertTokenizer.from_pretrained(model_path)
+    encoder = get_encoder()
+    results = {"sentences": len(texts), "batch_size": args.batch_size,
+               "threads": os.environ.get("ENCODER_THREADS", "default")}
+
+    # before
+    order = np.random.default_rng(args.seed).permutation(len(texts))
+    batches = [order[i:i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+    X_before = np.empty((len(texts), 768), dtype=np.float32)
+    tokenize_s = 0.0
+    start = time.perf_counter()
+    for batch in batches:
+        t = time.perf_counter()
+        encoded = slow_tokenizer([texts[i] for i in batch], padding=True, truncation=True, return_tensors="np")
+        tokenize_s += time.perf_counter() - t
+        X_before[batch] = encoder(encoded["input_ids"].astype(np.int64), encoded["attention_mask"].astype(np.int64))
+    total_s = time.perf_counter() - start
+    lengths = [len(ids) for ids in slow_tokenizer(texts, truncation=True)["input_ids"]]
+    results["before"] = {**padding_report(lengths, batches), "tokenize_s": round(tokenize_s, 2),
+                         "sentences_per_s": round(len(texts) / total_s, 1)}
+
+    # after
+    t = time.perf_counter()
+    lengths = np.array([len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]])
+    tokenize_s = time.perf_counter() - t
+    order = np.argsort(lengths, kind="stable")
+    batches = [order[i:i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+    start = time.perf_counter()
+    X_after = feature_gen_batch(texts, batch_size=args.batch_size)
+    total_s = time.perf_counter() - start
+    results["after"] = {**padding_report(lengths, batches), "tokenize_s": round(tokenize_s, 2),
+                        "sentences_per_s": round(len(texts) / total_s, 1)}
+
+    results["max_abs_diff"] = round(float(np.max(np.abs(X_before - X_after))), 5)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
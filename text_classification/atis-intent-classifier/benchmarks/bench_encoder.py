@@ -0,0 +1,113 @@
+"""CPU latency and memory of the encoder backends.
+
+Each backend is measured in its own process, on CPU, over the phrases of
+atis_intents_test.csv:
+  - load_s / load_rss_mb: time and resident memory added by loading it
+  - single_p50_ms / single_p99_ms: one phrase per call, as /predict does
+  - batch_sentences_per_s: `--batch-size` phrases per call
+  - peak_rss_mb: peak resident memory of the process
+
+`--backends` takes `torch` and/or paths to ONNX files from
+`python model/export_onnx.py --quantize`.
+
+Usage (from the project root):
+    python benchmarks/bench_encoder.py --threads 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BACKENDS = ["torch",
+                    os.path.join(ROOT, "model", "distilbert_cls.onnx"),
+                    os.path.join(ROOT, "model", "distilbert_cls.int8.onnx")]
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def measure(backend, n_single, batch_size):
+    """Run in a child process: the backend is fixed when feature_extraction is imported."""
+    import numpy as np
+    import pandas as pd
+
+    texts = pd.read_csv(os.path.join(ROOT, "data", "atis_intents_test.csv"))["text"].tolist()
+
+    before = rss_mb()
+    start = time.perf_counter()
+    from model.feature_extraction import feature_gen
+    feature_gen(texts[:batch_size])  # warm up
+    load_s = time.perf_counter() - start
+    load_rss = rss_mb() - before
+
+    latencies = []
+    for text in texts[:n_single]:
+        start = time.perf_counter()
+        feature_gen(text)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        feature_gen(texts[i:i + batch_size])
+    batch_s = time.perf_counter() - start
+
+    return {
+        "load_s": round(load_s, 2),
+        "load_rss_mb": round(load_rss, 1),
+        "single_p50_ms": round(1000 * float(np.percentile(latencies, 50)), 2),
+        "single_p99_ms": round(1000 * float(np.percentile(latencies, 99)), 2),
+        "batch_sentences_per_s": round(len(texts) / batch_s, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    parser.add_argument("--single", type=int, default=300, help="phrases encoded one at a time")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="OMP_NUM_THREADS for each backend")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(measure(args.child, args.single, args.batch_size)))
+        return
+
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES="")
+    if args.threads:
+        env["OMP_NUM_THREADS"] = str(args.threads)
+    results = {}
+    for backend in args.backends:
+        if backend == "torch":
+            name = "torch"
+            env.update(ENCODER_BACKEND="torch")
+        else:
+            name = os.path.basename(backend)
+            if not os.path.exists(backend):
+                results[name] = "missing: run python model/export_onnx.py --quantize"
+                continue
+            env.update(ENCODER_BACKEND="onnx", ONNX_MODEL_PATH=os.path.abspath(backend))
+        out = subprocess.run([sys.executable, __file__, "--child", backend,
+                              "--single", str(args.single), "--batch-size", str(args.batch_size)],
+                             env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        results[name] = json.loads(out.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
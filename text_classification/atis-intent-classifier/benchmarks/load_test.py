@@ -0,0 +1,130 @@
+"""Load test for /predict: one encoder pass per request vs micro-batching.
+
+Sends ATIS test phrases to the Flask app from `--clients` concurrent
+threads (through `app.test_client()`, so no server or network is needed)
+and reports throughput and p50/p99 latency for:
+  - single:  BATCHING=0, every request runs DistilBERT on its own
+  - batched: requests are grouped by the micro-batcher
+
+The prediction cache is disabled (CACHE_SIZE=0) so every request reaches
+the encoder.
+
+`--fake-encoder` replaces DistilBERT with a stand-in that sleeps
+`--fake-base-ms + --fake-per-text-ms * batch size` and returns random
+features, so the queueing behaviour can be measured without torch. Like a
+real model on one device, it runs one forward pass at a time.
+
+Usage (from the project root):
+    python benchmarks/load_test.py --requests 2000 --clients 32
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def install_fake_encoder(base_ms, per_text_ms, dim=768):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    device = threading.Lock()
+
+    def feature_gen(text):
+        texts = [text] if isinstance(text, str) else list(text)
+        with device:
+            time.sleep((base_ms + per_text_ms * len(texts)) / 1000)
+            return rng.standard_normal((len(texts), dim)).astype(np.float32)
+
+    module = types.ModuleType("model.feature_extraction")
+    module.feature_gen = feature_gen
+    module.encoder_id = lambda: "fake"
+    module.reset_encoder = lambda: None
+    sys.modules["model.feature_extraction"] = module
+
+
+def load_texts():
+    import pandas as pd
+
+    return pd.read_csv(os.path.join(ROOT, "data", "atis_intents_test.csv"))["text"].str.strip().tolist()
+
+
+def run(client, texts, n_requests, n_clients):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(n_requests))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            response = client.post("/predict", json={"text": texts[i % len(texts)]})
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, response.data
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 2),
+        "p99_ms": round(1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--fake-encoder", action="store_true")
+    parser.add_argument("--fake-base-ms", type=float, default=8)
+    parser.add_argument("--fake-per-text-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    if args.fake_encoder:
+        install_fake_encoder(args.fake_base_ms, args.fake_per_text_ms)
+    os.environ["BATCH_MAX_SIZE"] = str(args.max_batch_size)
+    os.environ["BATCH_MAX_WAIT_MS"] = str(args.max_wait_ms)
+    os.environ["CACHE_SIZE"] = "0"
+
+    import app as server
+    from model.batcher import MicroBatcher
+
+    texts = load_texts()
+    client = server.app.test_client()
+    server.predict_rankings(texts[:8])  # warm up
+
+    results = {"clients": args.clients, "max_batch_size": args.max_batch_size,
+               "max_wait_ms": args.max_wait_ms, "fake_encoder": args.fake_encoder}
+    server.batcher = None
+    results["single"] = run(client, texts, args.requests, args.clients)
+    server.batcher = MicroBatcher(lambda batch: server.rank_intents(batch),
+                                  max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    results["batched"] = run(client, texts, args.requests, args.clients)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Parity check: ONNX encoder vs PyTorch on atis_intents_test.csv.
+
+Encodes the test split with the PyTorch DistilBERT and with each
+`--onnx-models` file, classifies both with model/intent_model.pkl and
+reports how often the predicted intents agree, the test accuracy of each,
+and how far the [CLS] embeddings drift (max absolute difference, lowest
+cosine similarity). Exits with status 1 if any model agrees with PyTorch
+on fewer than `--min-agreement` of the phrases.
+
+Export the models first with `python model/export_onnx.py --quantize`.
+
+Usage (from the project root):
+    python benchmarks/onnx_parity.py --min-agreement 0.99
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODELS = [os.path.join(ROOT, "model", "distilbert_cls.onnx"),
+                  os.path.join(ROOT, "model", "distilbert_cls.int8.onnx")]
+
+
+def embed(texts, encode, batch_size):
+    import numpy as np
+    from model.feature_extraction import feature_gen
+
+    return np.vstack([feature_gen(texts[i:i + batch_size], encode)
+                      for i in range(0, len(texts), batch_size)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--onnx-models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import numpy as np
+    import pandas as pd
+    from model.feature_extraction import load_encoder
+
+    df = pd.read_csv(os.path.join(ROOT, "data", "atis_intents_test.csv"))
+    texts = df["text"].tolist()
+    labels = df["intent"].values
+    with open(os.path.join(ROOT, "model", "intent_model.pkl"), "rb") as f:
+        clf = pickle.load(f)
+
+    X_torch = embed(texts, load_encoder("torch"), args.batch_size)
+    y_torch = clf.predict(X_torch)
+    results = {"phrases": len(texts), "torch_accuracy": round(float(np.mean(y_torch == labels)), 4)}
+
+    failed = False
+    for path in args.onnx_models:
+        X_onnx = embed(texts, load_encoder("onnx", path), args.batch_size)
+        y_onnx = clf.predict(X_onnx)
+        cosine = np.sum(X_torch * X_onnx, axis=1) / (
+            np.linalg.norm(X_torch, axis=1) * np.linalg.norm(X_onnx, axis=1))
+        agreement = float(np.mean(y_onnx == y_torch))
+        failed |= agreement < args.min_agreement
+        results[os.path.basename(path)] = {
+            "agreement": round(agreement, 4),
+            "accuracy": round(float(np.mean(y_onnx == labels)), 4),
+            "max_abs_diff": round(float(np.max(np.abs(X_torch - X_onnx))), 5),
+            "min_cosine": round(float(np.min(cosine)), 5),
+        }
+
+    print(json.dumps(results, indent=2))
+    if failed:
+        print(f"FAILED: prediction agreement below {args.min_agreement}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Group concurrent single-text requests into batched calls.
+
+    Requests are queued; a worker thread takes the first waiting text and,
+    if others are already queued behind it, keeps collecting until
+    `max_batch_size` texts are queued or `max_wait_ms` has passed. It then
+    calls `fn` once on the whole batch and hands every caller its own
+    result. A lone request is not held back for the window. `fn` takes a list of texts and returns one result per
+    text, in order.
+    """
+    def __init__(self, fn, max_batch_size=32, max_wait_ms=5.0):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """Queue one text; returns a Future resolving to its result."""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def predict(self, texts):
+        """Queue several texts and wait for all their results."""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # Nothing else waiting: no load to batch with, so don't wait for it.
+        if self._queue.empty():
+            return batch
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                results = self.fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
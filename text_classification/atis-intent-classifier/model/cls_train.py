@@ -3,9 +3,10 @@ import numpy as np
 import pickle
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
-from feature_extraction import feature_gen
+from feature_extraction import encoder_id, feature_gen_batch
+from feature_store import FeatureStore
 
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset
 
 
 class TextDataset(Dataset):
@@ -34,41 +35,35 @@ class TextDataset(Dataset):
 
 
 
-# Prepare datasets & loaders
+# Prepare datasets
 train_dataset = TextDataset(train=True)
 test_dataset = TextDataset(train=False)
 
-train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-test_loader = DataLoader(test_dataset, batch_size = 32, shuffle = False)
 
+# Embeddings are cached in ../features per encoder and dataset contents;
+# only new or edited phrases go through the encoder.
+store = FeatureStore(encoder_id(), feature_gen_batch)
 
-# Generate embeddings in batches
-def get_embeddings_and_labels(dataloader):
-    X_list = []
-    y_list = []
 
-    for batch_texts, batch_labels in dataloader:
-        emb = feature_gen(batch_texts)
-        X_list.append(emb)
-        y_list.extend(batch_labels)
-
-    X = np.vstack(X_list)
-    y = np.array(y_list)
+def get_embeddings_and_labels(dataset):
+    X = store.features(dataset.texts)   # memory-mapped, not copied
+    y = np.array(dataset.labels)
 
     return X, y
 
 
-print("Generating training embeddings...")
-X_train, y_train = get_embeddings_and_labels(train_loader)
-
-print("Generating test embeddings...")
-X_test, y_test = get_embeddings_and_labels(test_loader)
+print("Loading training embeddings...")
+X_train, y_train = get_embeddings_and_labels(train_dataset)
 
 
 clf = LogisticRegression(random_state = 42, max_iter = 1000, class_weight='balanced')
 clf.fit(X_train, y_train)
 
-y_pred = clf.predict(X_test)
+# Stream the test embeddings chunk by chunk
+print("Evaluating on test embeddings...")
+y_test = np.array(test_dataset.labels)
+y_pred = np.concatenate([clf.predict(X) for X in store.iter_chunks(test_dataset.texts)])
+print(f"Feature store: embedded {store.embedded} rows, reused {store.reused}")
 print(classification_report(y_test, y_pred))
 
 # Save model
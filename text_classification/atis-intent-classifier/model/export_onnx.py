@@ -0,0 +1,69 @@
+"""
+Export the DistilBERT encoder to ONNX for ENCODER_BACKEND=onnx.
+
+The exported graph outputs only the [CLS] embedding (batch_size, hidden_size),
+so the rest of last_hidden_state is never copied out of the runtime.
+With --quantize, an int8 dynamically-quantized copy is written as well.
+
+Usage:
+    python model/export_onnx.py --quantize
+"""
+import argparse
+import os
+import torch
+from transformers import DistilBertModel
+from feature_extraction import model_dir, model_path
+
+
+class ClsEncoder(torch.nn.Module):
+    """DistilBERT returning only the [CLS] vector of the last hidden state."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+        return outputs.last_hidden_state[:, 0, :]
+
+
+def export(output, opset=17):
+    model = DistilBertModel.from_pretrained(model_path)
+    model.eval()
+
+    # Any example input works: batch and sequence axes are dynamic.
+    input_ids = torch.ones((2, 8), dtype=torch.long)
+    attention_mask = torch.ones((2, 8), dtype=torch.long)
+    torch.onnx.export(ClsEncoder(model),
+                      (input_ids, attention_mask),
+                      output,
+                      input_names=['input_ids', 'attention_mask'],
+                      output_names=['cls_embedding'],
+                      dynamic_axes={'input_ids': {0: 'batch', 1: 'sequence'},
+                                    'attention_mask': {0: 'batch', 1: 'sequence'},
+                                    'cls_embedding': {0: 'batch'}},
+                      opset_version=opset,
+                      do_constant_folding=True)
+
+
+def quantize(fp32_path, int8_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # Weights to int8; activations are quantized on the fly per batch.
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the DistilBERT [CLS] encoder to ONNX")
+    parser.add_argument('--output', default=os.path.join(model_dir, 'distilbert_cls.onnx'))
+    parser.add_argument('--quantize', action='store_true',
+                        help="also write an int8 dynamically-quantized model next to --output")
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    export(args.output, args.opset)
+    print(f"Saved ONNX encoder to {args.output}")
+
+    if args.quantize:
+        int8_path = os.path.splitext(args.output)[0] + '.int8.onnx'
+        quantize(args.output, int8_path)
+        print(f"Saved int8 ONNX encoder to {int8_path}")
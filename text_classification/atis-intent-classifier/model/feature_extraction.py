@@ -1,28 +1,138 @@
-import torch
-from transformers import DistilBertTokenizer, DistilBertModel
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+import os
+import threading
+import numpy as np
+from transformers import DistilBertTokenizerFast
 
 model_path = "distilbert-base-uncased"  # uncased: accepts upper and lower letters
+model_dir = os.path.dirname(os.path.abspath(__file__))
+
+# ENCODER_BACKEND=onnx runs the encoder exported by export_onnx.py with
+# ONNX Runtime on CPU instead of PyTorch; ONNX_MODEL_PATH picks the file
+# (e.g. the int8-quantized one).
+BACKEND = os.environ.get('ENCODER_BACKEND', 'torch')
+ONNX_MODEL_PATH = os.environ.get('ONNX_MODEL_PATH', os.path.join(model_dir, 'distilbert_cls.onnx'))
+# CPU threads for one forward pass; unset keeps the backend's default.
+ENCODER_THREADS = int(os.environ['ENCODER_THREADS']) if os.environ.get('ENCODER_THREADS') else None
+
+
+def load_encoder(backend=BACKEND, onnx_path=ONNX_MODEL_PATH, threads=ENCODER_THREADS):
+    """
+    Load the encoder for `backend` ('torch' or 'onnx').
+    Returns a function mapping tokenized input_ids and attention_mask
+    (numpy int64 arrays) to the [CLS] embeddings.
+    """
+    if backend == 'onnx':
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+
+        def encode(input_ids, attention_mask):
+            cls_embeddings, = session.run(None, {'input_ids': input_ids,
+                                                 'attention_mask': attention_mask})
+            return cls_embeddings
+
+        return encode
+
+    if backend != 'torch':
+        raise ValueError(f"Unknown encoder backend: {backend!r} (expected 'torch' or 'onnx')")
+
+    import torch
+    from transformers import DistilBertModel
+
+    if threads:
+        torch.set_num_threads(threads)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = DistilBertModel.from_pretrained(model_path).to(device)
+    model.eval()
+
+    def encode(input_ids, attention_mask):
+        with torch.inference_mode():
+            outputs = model(input_ids=torch.from_numpy(input_ids).to(device),
+                            attention_mask=torch.from_numpy(attention_mask).to(device))
+        return outputs.last_hidden_state[:, 0, :].cpu().numpy()
+
+    return encode
 
-# Load once for reuse
-tokenizer = DistilBertTokenizer.from_pretrained(model_path)
-model = DistilBertModel.from_pretrained(model_path).to(device)
 
+def encoder_id(backend=BACKEND, onnx_path=ONNX_MODEL_PATH):
+    """
+    Identify the encoder that load_encoder(backend, onnx_path) would load,
+    without loading it. Embeddings from different ids are not interchangeable;
+    re-exporting the ONNX file changes its id.
+    """
+    if backend == 'onnx':
+        stat = os.stat(onnx_path)
+        return f"onnx:{model_path}:{os.path.abspath(onnx_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{backend}:{model_path}"
 
-def feature_gen(text):
-    encoded = tokenizer(text, 
+
+# Load once for reuse; the encoder itself on first use, so callers that
+# only need cached features never load the model.
+tokenizer = DistilBertTokenizerFast.from_pretrained(model_path)
+encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    global encoder
+    with _encoder_lock:
+        if encoder is None:
+            encoder = load_encoder()
+    return encoder
+
+
+def reset_encoder():
+    """Drop the loaded encoder; the next call loads it again (e.g. after a re-export)."""
+    global encoder
+    with _encoder_lock:
+        encoder = None
+
+
+def feature_gen(text, encode=None):
+    encoded = tokenizer(text,
                         add_special_tokens=True,
                         padding=True,               # pad to longest in batch
                         truncation=True,            # truncate to BERT's limit
-                        return_tensors='pt')
+                        return_tensors='np')
 
-    input_ids = encoded['input_ids'].to(device)
-    attention_mask = encoded['attention_mask'].to(device)
+    input_ids = encoded['input_ids'].astype(np.int64)
+    attention_mask = encoded['attention_mask'].astype(np.int64)
 
-    with torch.no_grad():
-        outputs = model(input_ids=input_ids,
-                        attention_mask=attention_mask)
-    cls_embeddings = outputs.last_hidden_state[:, 0, :].cpu().numpy(dtype=np.float32)
+    cls_embeddings = (encode or get_encoder())(input_ids, attention_mask).astype(np.float32)
 
     return cls_embeddings   # (batch_size, hidden_size)
+
+
+def feature_gen_batch(texts, batch_size=32, encode=None):
+    """
+    Embed many texts with as little padding as possible.
+    Texts are tokenized once, sorted by token length and encoded in batches
+    of `batch_size` similar lengths; the embeddings are returned in the
+    original order.
+    """
+    input_ids = tokenizer(list(texts),
+                          add_special_tokens=True,
+                          truncation=True)['input_ids']
+    lengths = np.array([len(ids) for ids in input_ids])
+    order = np.argsort(lengths, kind='stable')
+
+    encode = encode or get_encoder()
+    cls_embeddings = None
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        max_len = lengths[batch].max()
+        ids = np.full((len(batch), max_len), tokenizer.pad_token_id, dtype=np.int64)
+        mask = np.zeros((len(batch), max_len), dtype=np.int64)
+        for row, i in enumerate(batch):
+            ids[row, :lengths[i]] = input_ids[i]
+            mask[row, :lengths[i]] = 1
+
+        emb = encode(ids, mask)
+        if cls_embeddings is None:
+            cls_embeddings = np.empty((len(order), emb.shape[1]), dtype=np.float32)
+        cls_embeddings[batch] = emb
+
+    return cls_embeddings   # (len(texts), hidden_size)
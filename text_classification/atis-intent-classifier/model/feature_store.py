@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+import numpy as np
+
+store_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'features')
+FEATURE_STORE_DIR = os.environ.get('FEATURE_STORE_DIR', store_dir)
+
+
+def row_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def dataset_key(row_keys):
+    return hashlib.sha256('\n'.join(row_keys).encode()).hexdigest()[:32]
+
+
+class FeatureStore:
+    """
+    Embeddings saved as .npy files, one per (encoder, dataset contents).
+
+    Files live in FEATURE_STORE_DIR/<encoder hash>/<dataset hash>.npy, with
+    the per-row text hashes in a .json manifest next to them. A dataset seen
+    before is memory-mapped read-only, without copying or loading the
+    encoder. For a new or edited dataset, rows whose text is already in any
+    file of the same encoder are copied from it; only the rest are embedded.
+    `embedded` and `reused` count the rows built that way so far.
+    """
+    def __init__(self, encoder, embed, root=FEATURE_STORE_DIR):
+        """
+        encoder: id of the encoder (feature_extraction.encoder_id())
+        embed:   function mapping a list of texts to a float32 matrix,
+                 e.g. feature_extraction.feature_gen_batch
+        """
+        self.encoder = encoder
+        self.embed = embed
+        self.dir = os.path.join(root, hashlib.sha256(encoder.encode()).hexdigest()[:16])
+        self.embedded = self.reused = 0
+
+    def features(self, texts):
+        """Return the (len(texts), hidden_size) embeddings as a read-only memmap."""
+        texts = [str(text) for text in texts]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [row_key(text) for text in texts]
+        path = os.path.join(self.dir, dataset_key(keys) + '.npy')
+        # The manifest is written first, so a .npy without one is incomplete.
+        if not (os.path.exists(path) and os.path.exists(path[:-len('.npy')] + '.json')):
+            embedded, reused = self._build(path, texts, keys)
+            self.embedded += embedded
+            self.reused += reused
+        return np.load(path, mmap_mode='r')
+
+    def iter_chunks(self, texts, chunk_size=1024):
+        """Yield the embeddings of `texts` in consecutive chunks of rows."""
+        X = self.features(texts)
+        for start in range(0, len(X), chunk_size):
+            yield X[start:start + chunk_size]
+
+    def _known_rows(self):
+        """Map row key -> (.npy path, row) over the files already stored."""
+        known = {}
+        if not os.path.isdir(self.dir):
+            return known
+        for name in os.listdir(self.dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.dir, name[:-len('.json')] + '.npy')
+            if not os.path.exists(path):
+                continue
+            with open(os.path.join(self.dir, name)) as f:
+                for row, key in enumerate(json.load(f)['rows']):
+                    known.setdefault(key, (path, row))
+        return known
+
+    def _build(self, path, texts, keys):
+        """Write the embeddings of `texts`; returns the rows (embedded, reused)."""
+        known = self._known_rows()
+        missing = list(dict.fromkeys(key for key in keys if key not in known))
+        text_of = dict(zip(keys, texts))
+        new = self.embed([text_of[key] for key in missing]) if missing else None
+        new_row = {key: row for row, key in enumerate(missing)}
+
+        if new is not None:
+            dim = new.shape[1]
+        else:
+            dim = np.load(next(iter(known.values()))[0], mmap_mode='r').shape[1]
+
+        # Gather rows per source file so each one is opened once.
+        copies = defaultdict(lambda: ([], []))
+        for i, key in enumerate(keys):
+            if key in new_row:
+                continue
+            src, row = known[key]
+            copies[src][0].append(i)
+            copies[src][1].append(row)
+
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = path + '.tmp'
+        X = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(len(keys), dim))
+        for src, (dst_rows, src_rows) in copies.items():
+            X[dst_rows] = np.load(src, mmap_mode='r')[src_rows]
+        dst_rows = [i for i, key in enumerate(keys) if key in new_row]
+        if dst_rows:
+            X[dst_rows] = new[[new_row[keys[i]] for i in dst_rows]]
+        X.flush()
+        del X
+
+        manifest = path[:-len('.npy')] + '.json'
+        with open(manifest + '.tmp', 'w') as f:
+            json.dump({'encoder': self.encoder, 'rows': keys}, f)
+        os.replace(manifest + '.tmp', manifest)
+        os.replace(tmp, path)
+        return len(dst_rows), len(keys) - len(dst_rows)